@@ -5,10 +5,24 @@
 
 - openlibrary: Open Library API へ問い合わせる処理
 - googlebooks: Google Books から不足情報を補完する処理
+- completeness: 必要な項目がそろっているかを見て、Google 補完を省くか決める処理
 - amazon: Amazon の商品/検索リンクを作る処理（安全なリンク生成のみ）
 - service: 各APIの結果をまとめて「1冊の本の情報」に統合する中核
 - covers: カバー画像をダウンロードする処理
+- cache: 実行をまたいで結果を覚えておくキャッシュ
+- coverstore: カバー画像を中身で重複排除して保存する処理（縮小版の作成も）
 - render: 画面表示用のテキストを組み立てる処理
+- pipeline: バッチ入力を少しずつ読み、並行処理して順番どおりに返す処理
+- writers: 結果を1件ずつファイル/画面に書き出す処理（text / json / jsonl / sqlite / parquet）
+- refresh: 既存の結果ファイルを、変わった分だけ取り直す処理
+- prefixindex: 取得済み・キャッシュ済みの本を、入力途中のタイトル・著者名から即座に引く索引
+- crawl: 著者・主題の全作品を、ページを先読みしながら順に読み進める処理（再開可能）
+- negcache: 見つからない/失敗したタイトルを覚えて、しばらく問い合わせない処理
+- hedge: 遅い問い合わせに保険のリクエストを重ねて待ち時間の裾を減らす処理
+- deadline: 1冊あたりの持ち時間を各段階のタイムアウトに配る処理（時間切れなら部分的な結果）
+- breaker: 失敗が続く接続先への通信を一時停止するサーキットブレーカー
+- transfer: 通信の圧縮方式の指定と、通信量（圧縮されたまま / 展開後）の集計
+- server: 常駐して HTTP/JSON で問い合わせに答えるローカルサーバー
 - cli: コマンドライン引数の受け取り～結果出力までの流れ
 """
 
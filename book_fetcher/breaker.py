@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+"""サーキットブレーカー（接続先ごとの「一時停止」スイッチ）
+
+非エンジニア向けの要点:
+- ある接続先（例: www.googleapis.com）で失敗が続いたら、しばらくその接続先への通信を止め、
+  タイムアウトを待たずにすぐ失敗として扱います（全体の処理が何十倍も遅くなるのを防ぐ）。
+- 一定時間たったら1件だけ試しに通信し（半開き）、成功すれば元に戻します。
+- 失敗とみなすのは、接続できない・時間切れ・429（回数制限）・5xx（サーバー側の障害）です。
+"""
+
+import threading
+import time
+from typing import Dict, Set
+
+
+class CircuitOpenError(Exception):
+    """接続先が一時停止中のため、通信せずに失敗したことを表す。"""
+
+    def __init__(self, host: str, retry_in: float) -> None:
+        self.host = host
+        self.retry_in = retry_in
+        super().__init__(f"circuit open for {host} (retry in {retry_in:.0f}s)")
+
+
+class CircuitBreaker:
+    """接続先（ホスト）ごとに、連続失敗で通信を一時停止する。
+
+    引数:
+    - failure_threshold: 何回連続で失敗したら停止するか（0 なら無効）
+    - reset_timeout: 停止してから試しの通信を許すまでの秒数
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+        self._probing: Set[str] = set()
+        self._lock = threading.Lock()
+        self.tripped: Set[str] = set()  # 一度でも停止した接続先
+        self.fast_failures = 0  # 停止中のため通信せずに失敗させた回数
+
+    def before(self, host: str) -> None:
+        """通信の前に呼ぶ。停止中なら CircuitOpenError を送出する。"""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            opened = self._opened_at.get(host)
+            if opened is None:
+                return
+            elapsed = time.monotonic() - opened
+            if elapsed >= self.reset_timeout and host not in self._probing:
+                self._probing.add(host)  # 半開き: この1件だけ通す
+                return
+            self.fast_failures += 1
+            raise CircuitOpenError(host, max(0.0, self.reset_timeout - elapsed))
+
+    def success(self, host: str) -> None:
+        """通信が成功したら呼ぶ（停止を解除する）。"""
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+            self._probing.discard(host)
+
+    def failure(self, host: str) -> None:
+        """通信が失敗したら呼ぶ（連続失敗が閾値に達したら停止する）。"""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            n = self._failures.get(host, 0) + 1
+            self._failures[host] = n
+            if host in self._probing or n >= self.failure_threshold:
+                self._opened_at[host] = time.monotonic()
+                self.tripped.add(host)
+            self._probing.discard(host)
+
+    def release(self, host: str) -> None:
+        """成功とも失敗とも言えない結果のとき呼ぶ（試しの通信の枠だけ戻す）。"""
+        with self._lock:
+            self._probing.discard(host)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+"""キャッシュ（実行をまたいで結果を覚えておく仕組み）
+
+非エンジニア向けの要点:
+- 1つのJSONファイルに「キー → 値（と有効期限）」を保存します。
+- 有効期限を過ぎた値は「無いもの」として扱われます。
+- 複数スレッドから同時に使っても壊れないようにしています。
+- ファイル名が .gz / .zst で終わる場合は圧縮して保存します（大きなキャッシュのディスク読み書きを減らす）。
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from .utils import open_text, require_codec, set_default_mode
+
+
+class JsonCache:
+    """有効期限つきのキー/値キャッシュ（JSONファイルに保存）。
+
+    引数:
+    - path: 保存先ファイル（.gz / .zst なら圧縮）。None ならメモリ上だけで使う
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = os.path.abspath(path) if path else None
+        self._data: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        if self.path:
+            require_codec(self.path)
+        if self.path and os.path.exists(self.path):
+            self._data = self._load(self.path)
+
+    @staticmethod
+    def _load(path: str) -> Dict[str, Dict[str, Any]]:
+        """ファイルを読み込む。壊れている場合は空のキャッシュとして扱う。"""
+        try:
+            with open_text(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError, EOFError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """キーの値を返す。無い・期限切れなら default。"""
+        with self._lock:
+            entry = self._data.get(key)
+            if not entry:
+                return default
+            exp = entry.get("exp")
+            if exp is not None and exp < time.time():
+                del self._data[key]
+                self._dirty = True
+                return default
+            return entry.get("v", default)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """キーに値を保存する。ttl（秒）を指定するとその時間で期限切れになる。"""
+        entry: Dict[str, Any] = {"v": value}
+        if ttl is not None:
+            entry["exp"] = time.time() + ttl
+        with self._lock:
+            self._data[key] = entry
+            self._dirty = True
+
+    def delete(self, key: str) -> None:
+        """キーを削除する（無ければ何もしない）。"""
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self._dirty = True
+
+    def purge(self) -> int:
+        """期限切れの値をまとめて捨て、捨てた件数を返す（常駐するサーバーが定期的に呼ぶ）。"""
+        now = time.time()
+        with self._lock:
+            expired = [k for k, e in self._data.items() if e.get("exp") is not None and e["exp"] < now]
+            for k in expired:
+                del self._data[k]
+            if expired:
+                self._dirty = True
+        return len(expired)
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """期限内のキーと値を順に返す（呼び出した時点の内容のコピー）。"""
+        now = time.time()
+        with self._lock:
+            live = [(k, e.get("v")) for k, e in self._data.items() if e.get("exp") is None or e["exp"] >= now]
+        return iter(live)
+
+    def save(self) -> None:
+        """変更があればファイルに書き出す（期限切れの値は捨てる）。"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            now = time.time()
+            live = {k: e for k, e in self._data.items() if e.get("exp") is None or e["exp"] >= now}
+            d = os.path.dirname(self.path) or "."
+            os.makedirs(d, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=d, prefix=".tmp-", suffix="-" + os.path.basename(self.path))
+            os.close(fd)
+            try:
+                with open_text(tmp, "w") as f:
+                    json.dump(live, f, ensure_ascii=False, separators=(",", ":"))
+                set_default_mode(tmp)
+                os.replace(tmp, self.path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+            self._data = live
+            self._dirty = False
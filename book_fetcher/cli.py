@@ -5,21 +5,21 @@ from __future__ import annotations
 非エンジニア向けの要点:
 - 引数（オプション）を受け取り、バッチ/単体処理を切り替えます。
 - 標準プリセット（--preset standard）で一発実行が可能です。
+- 起動を速くするため、通信や処理のモジュールは実際に使う時点で読み込みます
+  （--help などでは requests 等を読み込みません）。
 """
 
 import argparse
-import json
 import os
 import sys
-from dataclasses import asdict
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
 
-from .covers import download_cover
-from .models import BookInfo
-from .openlibrary import search_openlibrary
-from .openlibrary import choose_candidate
-from .render import render_text
-from .service import build_cover_filename, fetch_book_info
+if TYPE_CHECKING:
+    from .cache import JsonCache
+    from .completeness import EnrichmentPolicy
+    from .hedge import Hedger
+    from .models import BookCandidate, BookInfo
+    from .prefixindex import PrefixIndex
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -32,16 +32,46 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument("--author", help="Filter by author name", default=None)
     parser.add_argument("--year", type=int, help="Filter by first publish year", default=None)
     parser.add_argument("--show-candidates", type=int, metavar="N", default=0, help="Show top N candidates and exit")
+    parser.add_argument("--index", metavar="PATH", help="Prefix index for --show-candidates and --serve /candidates (answers partial titles/authors locally; falls back to Open Library on a miss)")
+    parser.add_argument("--build-index", metavar="PATH", help="Build a prefix index at PATH from --index-from results files and --cache-file entries, then exit")
+    parser.add_argument("--index-from", metavar="PATH", action="append", help="Results file (JSON/JSONL) to include in --build-index (repeatable)")
     parser.add_argument("--pick-index", type=int, default=0, help="Pick candidate index (default 0)")
-    parser.add_argument("--format", choices=["text", "json"], default="text", help="Output format")
+    parser.add_argument("--format", choices=["text", "json", "jsonl", "sqlite", "parquet"], default="text", help="Output format (sqlite/parquet require --output-file; parquet requires pyarrow)")
     parser.add_argument("--download-cover", metavar="PATH", help="Download the cover image to PATH (uses --cover-size)")
     parser.add_argument("--cover-size", choices=["s", "m", "l"], default="l", help="Cover image size when downloading")
-    parser.add_argument("--input-file", metavar="PATH", help="Read titles from file (one per line; # and blank lines ignored)")
+    parser.add_argument("--input-file", metavar="PATH", help="Read titles from file, '-' for stdin, .gz supported (one per line; # and blank lines ignored)")
+    parser.add_argument("--hedge", action="store_true", help="Send a duplicate request when an upstream call is slower than recent latency (and race Google against a slow Open Library search with --use-google)")
+    parser.add_argument("--hedge-percentile", type=float, default=95.0, metavar="P", help="Latency percentile after which --hedge sends a duplicate request")
+    parser.add_argument("--hedge-budget", type=float, default=0.1, metavar="RATIO", help="Maximum extra requests from --hedge as a fraction of primary requests")
+    parser.add_argument("--deadline", type=float, metavar="SECONDS", help="Time budget per title; each stage gets the remaining time as its timeout and a partial result is returned when it runs out")
+    parser.add_argument("--breaker-threshold", type=int, default=5, metavar="N", help="Fail fast for a host after N consecutive failures (timeouts, connection errors, 429, 5xx); 0 disables")
+    parser.add_argument("--breaker-reset", type=float, default=30.0, metavar="SECONDS", help="Seconds before a tripped host gets a trial request")
+    parser.add_argument("--negative-cache", action="store_true", help="Remember not-found/failed titles in --cache-file and skip them until their re-check time (intervals double on each repeat)")
+    parser.add_argument("--miss-ttl", type=float, default=24.0, metavar="HOURS", help="Initial re-check interval for not-found titles with --negative-cache")
+    parser.add_argument("--error-ttl", type=float, default=30.0, metavar="MINUTES", help="Initial re-check interval for failed titles with --negative-cache")
+    parser.add_argument("--refresh", metavar="PATH", help="Incrementally refresh an existing results file (JSON/JSONL): revalidate stored records and refetch only new, stale or changed titles")
+    parser.add_argument("--refresh-max-age", type=float, metavar="DAYS", help="With --refresh, refetch records older than DAYS instead of revalidating them")
+    parser.add_argument("--crawl-author", metavar="NAME_OR_KEY", help="Batch over every work of an author (name or Open Library key such as OL23919A), streaming page by page")
+    parser.add_argument("--crawl-subject", metavar="SUBJECT", help="Batch over every work of an Open Library subject (e.g. science_fiction), streaming page by page")
+    parser.add_argument("--crawl-limit", type=int, metavar="N", help="Stop a crawl after N works")
+    parser.add_argument("--crawl-page-size", type=int, default=100, metavar="N", help="Works fetched per page in crawl mode (the next page is prefetched)")
+    parser.add_argument("--crawl-state", metavar="PATH", help="Save crawl progress to PATH and resume from it on the next run")
+    parser.add_argument("--workers", type=int, default=1, metavar="N", help="Process N titles concurrently in batch mode (output order is preserved)")
     parser.add_argument("--use-google", action="store_true", help="Augment results with Google Books when available")
+    parser.add_argument("--google-fields", metavar="FIELDS", default="description,publishers,publish_date,isbns,authors,covers", help="With --use-google, only query Google when one of these fields is still empty (description, publishers, publish_date, first_publish_year, isbns, authors, subjects, covers = all sizes, cover = any size; 'always' queries every title)")
     parser.add_argument("--google-api-key", default=os.environ.get("GOOGLE_BOOKS_API_KEY"), help="Google Books API key (optional; can use env GOOGLE_BOOKS_API_KEY)")
     parser.add_argument("--amazon-domain", choices=["co.jp","com","co.uk","de","fr","it","es","ca","com.au"], default="co.jp", help="Amazon domain for links")
     parser.add_argument("--output-file", metavar="PATH", help="Write results to PATH instead of stdout")
     parser.add_argument("--covers-dir", metavar="DIR", help="Download cover images for each entry to DIR (batch mode)")
+    parser.add_argument("--probe-covers", action="store_true", help="Check cover URLs (HEAD/ranged GET) across Open Library ID/ISBN and Google before downloading, falling back to nearby sizes")
+    parser.add_argument("--cache-file", metavar="PATH", help="Persistent cache file (e.g. cover availability from --probe-covers)")
+    parser.add_argument("--cover-store", metavar="DIR", help="Content-addressed store for cover files (default: <covers-dir>/.store); duplicates are hardlinked")
+    parser.add_argument("--cover-variants", metavar="WIDTHS", help="Also write resized cover variants, e.g. 160,320 (requires Pillow)")
+    parser.add_argument("--cover-variant-format", choices=["webp", "jpeg"], default="webp", help="Image format for resized cover variants")
+    parser.add_argument("--cover-workers", type=int, default=4, metavar="N", help="Worker threads for resized cover variants")
+    parser.add_argument("--serve", action="store_true", help="Run a local HTTP/JSON API server instead of a one-shot lookup")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to bind in --serve mode")
+    parser.add_argument("--port", type=int, default=8765, help="Port to bind in --serve mode")
     parser.add_argument("--preset", choices=["standard"], help="Use preset options; 'standard' equals: --use-google --format json --input-file titles.txt --output-file results.json --covers-dir covers --cover-size l")
     return parser
 
@@ -66,10 +96,13 @@ def apply_standard_preset(args: argparse.Namespace) -> None:
     args.cover_size = args.cover_size or "l"
 
 
-def _load_titles(path: str) -> List[str]:
-    """入力ファイル（1行1タイトル）を読み込み、空行と#行を除く。"""
-    with open(path, "r", encoding="utf-8") as f:
-        return [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+def _cover_url(info: BookInfo, args: argparse.Namespace, cache: Optional[JsonCache]) -> Optional[str]:
+    """ダウンロードするカバーURLを決める（--probe-covers 指定時は実在確認したURL）。"""
+    if args.probe_covers:
+        from .covers import resolve_cover_url
+
+        return resolve_cover_url(info, args.cover_size, cache=cache)
+    return info.cover_urls.get(args.cover_size)
 
 
 def main(argv: Optional[List[str]] = None) -> int:
@@ -86,108 +119,484 @@ def main(argv: Optional[List[str]] = None) -> int:
     if args.preset == "standard":
         apply_standard_preset(args)
 
+    from .utils import configure_breaker, require_codec
+
+    configure_breaker(args.breaker_threshold, args.breaker_reset)
+    for path in (args.input_file, args.output_file, args.cache_file, args.refresh, args.crawl_state, *(args.index_from or [])):
+        try:
+            require_codec(path or "")
+        except RuntimeError as e:
+            parser.error(str(e))
+
+    from .completeness import parse_fields
+
+    try:
+        args.google_fields = parse_fields(args.google_fields)
+    except ValueError as e:
+        parser.error(f"--google-fields: {e}")
+    if args.deadline is not None and args.deadline <= 0:
+        parser.error("--deadline must be greater than 0")
+
+    if args.serve:
+        return _run_server(args)
+    if args.build_index:
+        return _build_index(args)
+
     no_cli_args = argv is None and len(sys.argv) <= 1
     if no_cli_args and os.path.exists("titles.txt"):
         apply_standard_preset(args)
 
-    if not args.title and not args.input_file:
+    crawl = bool(args.crawl_author or args.crawl_subject)
+    if not args.title and not args.input_file and not args.refresh and not crawl:
         parser.error("Provide a title or --input-file (or use --preset standard)")
+    if crawl and (args.input_file or args.refresh or (args.crawl_author and args.crawl_subject)):
+        parser.error("--crawl-author/--crawl-subject cannot be combined with each other, --input-file or --refresh")
+    if args.crawl_page_size < 1:
+        parser.error("--crawl-page-size must be at least 1")
 
-    if args.input_file and args.show_candidates:
+    batch = bool(args.input_file or args.refresh or crawl)
+    if batch and args.show_candidates:
         print("--show-candidates is not supported with --input-file.", file=sys.stderr)
         return 2
-    if args.input_file and args.download_cover:
+    if batch and args.download_cover:
         print("--download-cover is not supported with --input-file.", file=sys.stderr)
         return 2
-    if args.covers_dir and not args.input_file:
+    if args.covers_dir and not batch:
         print("--covers-dir is only supported with --input-file (batch mode).", file=sys.stderr)
         return 2
 
-    if args.input_file:
-        try:
-            titles = _load_titles(args.input_file)
-        except OSError as oe:
-            print(f"Failed to read input file: {oe}", file=sys.stderr)
-            return 2
-        if not titles:
-            print("No titles found in input file.")
-            return 1
+    from .writers import FILE_ONLY_FORMATS
+
+    if args.format in FILE_ONLY_FORMATS and not args.output_file:
+        print(f"--format {args.format} requires --output-file.", file=sys.stderr)
+        return 2
+    if args.negative_cache and not (batch and args.cache_file):
+        print("--negative-cache requires --cache-file in batch mode.", file=sys.stderr)
+        return 2
 
-        results: List[Dict[str, Any]] = []
-        text_blocks: List[str] = []
-        any_success = False
-        covers_saved = 0
+    cache = None
+    if args.cache_file:
+        from .cache import JsonCache
 
-        covers_dir = None
-        if args.covers_dir:
-            covers_dir = os.path.abspath(args.covers_dir)
+        cache = JsonCache(args.cache_file)
+    try:
+        return _run(args, cache)
+    finally:
+        if cache:
             try:
-                os.makedirs(covers_dir, exist_ok=True)
+                cache.save()
             except OSError as oe:
-                print(f"Failed to create covers directory: {oe}", file=sys.stderr)
+                print(f"Failed to write cache file: {oe}", file=sys.stderr)
+
+
+def _make_hedger(args: argparse.Namespace) -> Optional[Hedger]:
+    """--hedge 指定時に Hedger を作る（未指定なら None）。"""
+    if not args.hedge:
+        return None
+    from .hedge import Hedger
+
+    return Hedger(percentile=args.hedge_percentile, max_extra_ratio=args.hedge_budget)
+
+
+def _make_policy(args: argparse.Namespace) -> Optional[EnrichmentPolicy]:
+    """--use-google 指定時に、Google 補完をするかの判定を作る（未指定なら None）。"""
+    if not args.use_google:
+        return None
+    from .completeness import EnrichmentPolicy
+
+    return EnrichmentPolicy(args.google_fields)
+
+
+def _build_index(args: argparse.Namespace) -> int:
+    """--build-index: 結果ファイルとキャッシュから前方一致インデックスを作る。"""
+    if not (args.index_from or args.cache_file):
+        print("--build-index requires --index-from and/or --cache-file.", file=sys.stderr)
+        return 2
+    from .cache import JsonCache
+    from .prefixindex import build_index, cached_candidates, candidate_from_info
+    from .refresh import iter_records
+
+    def sources() -> Iterator[Tuple[Dict[str, Any], bool]]:
+        for path in args.index_from or []:
+            for info in iter_records(path):
+                yield candidate_from_info(info), True
+        if args.cache_file:
+            yield from cached_candidates(JsonCache(args.cache_file))
+
+    try:
+        n = build_index(sources(), args.build_index)
+    except (OSError, ValueError) as e:
+        print(f"Failed to build index: {e}", file=sys.stderr)
+        return 2
+    print(f"Indexed {n} book(s) to: {os.path.abspath(args.build_index)}")
+    return 0
+
+
+def _open_index(args: argparse.Namespace) -> Optional[PrefixIndex]:
+    """--index の索引を開く（未指定なら None）。開けなければ警告して None。"""
+    if not args.index:
+        return None
+    from .prefixindex import PrefixIndex
+
+    try:
+        return PrefixIndex(args.index)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring prefix index: {e}", file=sys.stderr)
+        return None
+
+
+def _run_server(args: argparse.Namespace) -> int:
+    """--serve: ローカルHTTP APIサーバーとして常駐する。"""
+    from .cache import JsonCache
+    from .server import BookService, serve
+
+    cache = JsonCache(args.cache_file)
+    service = BookService(
+        use_google=args.use_google,
+        google_api_key=args.google_api_key,
+        amazon_domain=args.amazon_domain,
+        cache=cache,
+        workers=max(args.workers, 8),
+        hedger=_make_hedger(args),
+        index=_open_index(args),
+        google_policy=_make_policy(args),
+        deadline=args.deadline,
+    )
+    try:
+        serve(service, host=args.host, port=args.port)
+    except OSError as oe:
+        print(f"Failed to start server: {oe}", file=sys.stderr)
+        return 2
+    finally:
+        try:
+            cache.save()
+        except OSError as oe:
+            print(f"Failed to write cache file: {oe}", file=sys.stderr)
+    return 0
+
+
+def _save_crawl_state(args: argparse.Namespace, mode: str, target: str, offset: int, done: bool) -> None:
+    """--crawl-state に進み具合を保存する（失敗しても警告だけ）。"""
+    if not args.crawl_state:
+        return
+    from .crawl import save_crawl_state
+
+    try:
+        save_crawl_state(args.crawl_state, mode, target, offset, done=done)
+    except OSError as oe:
+        print(f"Failed to write crawl state: {oe}", file=sys.stderr)
+
+
+def _run_batch(args: argparse.Namespace, cache: Optional[JsonCache]) -> int:
+    """バッチ処理（--input-file / --refresh / --crawl-*）。入力を少しずつ読み、結果を順番どおりに逐次出力する。"""
+    from .cache import JsonCache
+    from .covers import fetch_cover_bytes
+    from .coverstore import CoverStore
+    from .crawl import is_network_error
+    from .deadline import Deadline
+    from .negcache import NegativeCache, NegativeCacheHit
+    from .pipeline import open_titles, run_ordered
+    from .service import build_cover_filename, fetch_book_info
+    from .utils import is_transient_error
+    from .writers import open_writer
+
+    refresher = None
+    if args.refresh:
+        from .refresh import Refresher, detect_format, load_records
+
+        try:
+            records = load_records(args.refresh)
+            refresh_format = detect_format(args.refresh)
+        except (OSError, ValueError) as e:
+            print(f"Failed to read refresh file: {e}", file=sys.stderr)
+            return 2
+        refresher = Refresher(records, cache if cache is not None else JsonCache(), max_age_days=args.refresh_max_age)
+        if args.format == "text":
+            args.format = refresh_format
+        if not args.output_file:
+            if args.format != refresh_format:
+                print(
+                    f"--format {args.format} does not match the refresh file ({refresh_format}); "
+                    "pass --output-file to write the refreshed results elsewhere",
+                    file=sys.stderr,
+                )
                 return 2
+            args.output_file = args.refresh
 
-        for t in titles:
+    crawl_mode = "author" if args.crawl_author else "subject" if args.crawl_subject else None
+    crawl_target = args.crawl_author or args.crawl_subject
+    crawl_start = 0
+    try:
+        if crawl_mode:
+            from .crawl import CrawlTargetNotFound, crawl_author, crawl_subject, load_crawl_state
+
+            if args.crawl_state:
+                crawl_start, crawl_done = load_crawl_state(args.crawl_state, crawl_mode, crawl_target)
+                if crawl_done:
+                    print(
+                        f"Crawl of {crawl_mode} '{crawl_target}' is already complete (offset {crawl_start}); "
+                        f"delete {args.crawl_state} to crawl again",
+                        file=sys.stderr,
+                    )
+                    return 0
+            crawler = crawl_author if crawl_mode == "author" else crawl_subject
             try:
-                info = fetch_book_info(
-                    t,
-                    author=args.author,
-                    year=args.year,
-                    pick_index=args.pick_index,
-                    use_google=args.use_google,
-                    google_api_key=args.google_api_key,
-                    amazon_domain=args.amazon_domain,
-                )
-            except Exception as e:
-                print(f"Error for '{t}': {e}", file=sys.stderr)
-                continue
-            if not info:
-                print(f"No book found: {t}")
-                continue
-            any_success = True
+                titles = crawler(crawl_target, start=crawl_start, page_size=args.crawl_page_size, limit=args.crawl_limit)
+            except CrawlTargetNotFound as nf:
+                print(str(nf), file=sys.stderr)
+                return 1
+        elif args.input_file:
+            titles = open_titles(args.input_file)
+        else:
+            titles = refresher.titles()
+    except Exception as e:
+        print(f"Failed to read input: {e}", file=sys.stderr)
+        return 2
+
+    # JSONを標準出力へ流す場合、進捗メッセージは標準エラーへ（JSONを壊さないため）
+    log = sys.stderr if (args.format in ("json", "jsonl") and not args.output_file) else sys.stdout
+
+    covers_dir = None
+    store: Optional[CoverStore] = None
+    if args.covers_dir:
+        covers_dir = os.path.abspath(args.covers_dir)
+        try:
+            os.makedirs(covers_dir, exist_ok=True)
+        except OSError as oe:
+            print(f"Failed to create covers directory: {oe}", file=sys.stderr)
+            return 2
+        try:
+            widths = [int(w) for w in (args.cover_variants or "").split(",") if w.strip()]
+            store = CoverStore(
+                args.cover_store or os.path.join(covers_dir, ".store"),
+                variant_widths=widths,
+                variant_format=args.cover_variant_format,
+                workers=args.cover_workers,
+            )
+        except (ValueError, RuntimeError) as e:
+            print(f"Invalid cover store options: {e}", file=sys.stderr)
+            return 2
 
-            if args.format == "json":
-                results.append(asdict(info))
+    hedger = _make_hedger(args)
+    policy = _make_policy(args)
+
+    negcache = None
+    if args.negative_cache and cache is not None:
+        negcache = NegativeCache(cache, miss_ttl=args.miss_ttl * 3600, error_ttl=args.error_ttl * 60, use_google=args.use_google)
+
+    def fetch(title: str, author: Optional[str] = None, candidate: Optional[BookCandidate] = None) -> Optional[BookInfo]:
+        author = author or args.author
+        if negcache:
+            negcache.check(title, author, args.year)
+        try:
+            info = fetch_book_info(
+                title,
+                author=author,
+                year=args.year,
+                pick_index=args.pick_index,
+                use_google=args.use_google,
+                google_api_key=args.google_api_key,
+                amazon_domain=args.amazon_domain,
+                hedger=hedger,
+                google_policy=policy,
+                deadline=Deadline(args.deadline),
+                candidate=candidate,
+            )
+        except Exception:
+            if negcache:
+                negcache.record("error", title, author, args.year)
+            raise
+        if negcache:
+            if info:
+                negcache.clear(title, author, args.year)
             else:
-                if not args.output_file:
-                    print(render_text(info))
-                    print("-" * 40)
-                text_blocks.append(render_text(info) + "\n" + ("-" * 40) + "\n")
-
-            if covers_dir:
-                url = info.cover_urls.get(args.cover_size)
-                if url:
-                    try:
-                        name = build_cover_filename(info, args.cover_size)
-                        download_cover(url, os.path.join(covers_dir, name))
-                        covers_saved += 1
-                    except Exception:
-                        pass
-
-        if args.output_file:
-            out_path = os.path.abspath(args.output_file)
+                negcache.record("miss", title, author, args.year)
+        return info
+
+    def process(item: Any) -> Tuple[Optional[BookInfo], Optional[bool], Optional[str], Optional[BookInfo]]:
+        """1タイトル分の取得とカバー保存（作業スレッド上で実行）。
+
+        item はタイトル文字列、またはクロール時の CrawlItem（著者名と、検索し直さずに使う作品の候補つき）。
+
+        戻り値: (BookInfo, カバー保存結果: True=保存 / False=画像なし / None=対象外・失敗,
+                 --refresh 時の状態, --refresh 時の前回の記録)
+        """
+        status: Optional[str] = None
+        prior: Optional[BookInfo] = None
+        if refresher:
+            info, status, prior = refresher.refresh(item, fetch)
+        else:
+            info = fetch(str(item), getattr(item, "author", None), getattr(item, "candidate", None))
+        if not info or not (covers_dir and store) or status in ("unchanged", "kept"):
+            return info, None, status, prior
+        url = _cover_url(info, args, cache)
+        if not url:
+            return info, False, status, prior
+        try:
+            name = build_cover_filename(info, args.cover_size)
+            saved = store.save(fetch_cover_bytes(url), os.path.join(covers_dir, name))
+            return info, (True if saved else None), status, prior
+        except Exception as e:
+            if is_transient_error(e):
+                info.pending_enrichment.append("cover")  # 後で --refresh すると取り直す
+            return info, None, status, prior
+
+    try:
+        writer = open_writer(args.format, args.output_file)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Failed to write output file: {e}", file=sys.stderr)
+        return 2
+
+    if crawl_start and args.output_file and os.path.exists(args.output_file):
+        # 再開時は前回までの結果を引き継ぐ（出力ファイルは毎回まとめて書き直すため）
+        if args.format in ("json", "jsonl"):
+            from .refresh import iter_records
+
             try:
-                os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
-                with open(out_path, "w", encoding="utf-8") as f:
-                    if args.format == "json":
-                        json.dump(results, f, ensure_ascii=False, indent=2)
-                    else:
-                        f.write("".join(text_blocks))
-                print(f"Saved results to: {out_path}")
-            except OSError as oe:
-                print(f"Failed to write output file: {oe}", file=sys.stderr)
+                for prev in iter_records(args.output_file):
+                    writer.write(prev)
+            except (OSError, ValueError) as e:
+                writer.abort()
+                print(f"Failed to read previous crawl results: {e}", file=sys.stderr)
                 return 2
         else:
-            if args.format == "json":
-                print(json.dumps(results, ensure_ascii=False, indent=2))
+            print(f"Resuming crawl at offset {crawl_start}; {args.output_file} will contain only the remaining works", file=sys.stderr)
+
+    seen = 0
+    partial = 0
+    any_success = False
+    covers_saved = 0
+    covers_missing = 0
+    crawl_offset = crawl_start
+    interrupted = False
+    try:
+        for t, res, err in run_ordered(process, titles, workers=args.workers):
+            seen += 1
+            if crawl_mode:
+                crawl_offset = t.position + 1
+            if err is not None:
+                if isinstance(err, NegativeCacheHit):
+                    print(f"Skipped: {t} ({err})", file=log)
+                else:
+                    print(f"Error for '{t}': {err}", file=sys.stderr)
+                continue
+            info, cover, status, prior = res
+            if not info:
+                print(f"No book found: {t}", file=log)
+                continue
+            any_success = True
+            writer.write(info)
+            if info.pending_enrichment:
+                partial += 1
+            if refresher and status:
+                refresher.record(status, prior)
+                if status in ("added", "updated"):
+                    print(f"{'+' if status == 'added' else '~'} {t}", file=log)
+            if cover:
+                covers_saved += 1
+            elif cover is False:
+                covers_missing += 1
+        if not seen:
+            writer.abort()
+            if crawl_start:
+                # 前回の実行で一覧の最後まで読み終えていた（状態ファイルは完了として記録し直す）
+                print(f"Crawl of {crawl_mode} '{crawl_target}' is already complete (offset {crawl_start})", file=sys.stderr)
+                _save_crawl_state(args, crawl_mode, crawl_target, crawl_start, done=True)
+                return 0
+            print("No works found to crawl." if crawl_mode else "No titles found in input file.")
+            return 1
+    except KeyboardInterrupt:
+        if not (crawl_mode and args.crawl_state and seen):
+            writer.abort()
+            raise
+        # クロールは途中まで書いた結果を残し、状態ファイルに続きの位置を記録する
+        interrupted = True
+    except Exception as e:
+        if not (crawl_mode and args.crawl_state and seen and is_network_error(e)):
+            writer.abort()
+            print(f"Failed to read input or write output: {e}", file=sys.stderr)
+            return 2
+        print(f"Crawl stopped: {e}", file=sys.stderr)
+        interrupted = True
+    try:
+        writer.close()
+    except RuntimeError as e:
+        print(f"Failed to write output: {e}", file=sys.stderr)
+        return 2
+    if writer.path:
+        print(f"Saved results to: {writer.path}", file=log)
+    if crawl_mode and args.crawl_state:
+        # --crawl-limit で打ち切った場合は、一覧の続きがあるかもしれないので完了にしない
+        limited = args.crawl_limit is not None and seen >= args.crawl_limit
+        _save_crawl_state(args, crawl_mode, crawl_target, crawl_offset, done=not (interrupted or limited))
+        if interrupted:
+            print(f"Crawl interrupted at offset {crawl_offset}; run the same command again to resume", file=sys.stderr)
+    from .utils import BREAKER, TRANSFER
+
+    if TRANSFER.responses:
+        print(f"Network: {TRANSFER.summary()}", file=log)
+    if BREAKER.tripped:
+        print(f"Circuit breaker opened for: {', '.join(sorted(BREAKER.tripped))} ({BREAKER.fast_failures} request(s) failed fast)", file=log)
+    if partial:
+        print(f"Partially enriched: {partial} record(s) (run again with --refresh to fill them in)", file=log)
+    if policy and policy.stats["checked"]:
+        ps = policy.stats
+        print(f"Google augmentation: skipped {ps['skipped']} of {ps['checked']} call(s) (required fields already filled)", file=log)
+    if hedger:
+        hedger.shutdown()
+        hs = hedger.stats
+        print(f"Hedging: {hs['extra']} extra request(s) for {hs['primary']} call(s); {hs['hedge_wins']} won by duplicate, {hs['race_wins']} by Google race", file=log)
+    if negcache and negcache.skipped:
+        print(f"Negative cache: skipped {negcache.skipped} title(s)", file=log)
+    if refresher:
+        for gone in refresher.removed():
+            print(f"- {gone.query or gone.title}", file=log)
+        c = refresher.counts
+        print(
+            f"Refresh summary: {c['unchanged']} unchanged, {c['updated']} updated, {c['added']} added, "
+            f"{c['removed']} removed, {c['kept']} kept (check failed)",
+            file=log,
+        )
+
+    if covers_dir and store:
+        for err in store.close():
+            print(f"Failed to create cover variant: {err}", file=sys.stderr)
+        print(f"Saved cover images: {covers_saved} file(s) to {covers_dir}", file=log)
+        if covers_missing:
+            print(f"No available cover: {covers_missing} title(s)", file=log)
+        st = store.stats
+        print(f"Cover store: {st['deduplicated']} duplicate(s) linked, {st['placeholders']} placeholder(s) skipped, {st['variants']} variant(s)", file=log)
+    if interrupted:
+        return 130
+    return 0 if any_success else 1
+
 
-        if covers_dir:
-            print(f"Saved cover images: {covers_saved} file(s) to {covers_dir}")
-        return 0 if any_success else 1
+def _run(args: argparse.Namespace, cache: Optional[JsonCache]) -> int:
+    """引数の検証が済んだ後の実処理（バッチ/単体）。"""
+    if args.input_file or args.refresh or args.crawl_author or args.crawl_subject:
+        return _run_batch(args, cache)
+
+    import json
+    from dataclasses import asdict
+
+    from .deadline import Deadline
+    from .openlibrary import search_openlibrary
+    from .render import render_text
+    from .service import fetch_book_info
 
     # Single-title mode
     try:
-        candidates = search_openlibrary(args.title, author=args.author, year=args.year, limit=max(5, args.show_candidates or (args.pick_index + 1)))
+        limit = max(5, args.show_candidates or (args.pick_index + 1))
+        index = _open_index(args) if args.show_candidates else None
+        if index is not None:
+            from .prefixindex import search_candidates
+
+            try:
+                candidates, _ = search_candidates(args.title, author=args.author, year=args.year, limit=limit, index=index, cache=cache)
+            finally:
+                index.close()
+        else:
+            candidates = search_openlibrary(args.title, author=args.author, year=args.year, limit=limit)
     except Exception as e:
         print(f"Search error: {e}", file=sys.stderr)
         return 2
@@ -215,6 +624,8 @@ def main(argv: Optional[List[str]] = None) -> int:
             use_google=args.use_google,
             google_api_key=args.google_api_key,
             amazon_domain=args.amazon_domain,
+            google_policy=_make_policy(args),
+            deadline=Deadline(args.deadline),
         )
     except Exception as e:
         print(f"Fetch error: {e}", file=sys.stderr)
@@ -224,7 +635,19 @@ def main(argv: Optional[List[str]] = None) -> int:
         print("No book found.")
         return 1
 
-    if args.output_file:
+    if args.format not in ("text", "json"):
+        from .writers import open_writer
+
+        try:
+            writer = open_writer(args.format, args.output_file)
+            writer.write(info)
+            writer.close()
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"Failed to write output file: {e}", file=sys.stderr)
+            return 2
+        if writer.path:
+            print(f"Saved result to: {writer.path}")
+    elif args.output_file:
         out_path = os.path.abspath(args.output_file)
         try:
             os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
@@ -244,11 +667,13 @@ def main(argv: Optional[List[str]] = None) -> int:
             print(render_text(info))
 
     if args.download_cover:
-        url = info.cover_urls.get(args.cover_size)
+        url = _cover_url(info, args, cache)
         if not url:
             print("No cover image available to download.", file=sys.stderr)
         else:
             try:
+                from .covers import download_cover
+
                 download_cover(url, args.download_cover)
                 print(f"Saved cover image: {os.path.abspath(args.download_cover)}")
             except Exception as e:
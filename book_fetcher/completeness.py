@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+"""項目のそろい具合による Google 補完の判定（--google-fields）
+
+非エンジニア向けの要点:
+- Open Library の結果で「必要な項目」がすべて埋まっていれば、Google Books への問い合わせを省きます
+  （Google の利用回数の上限（クォータ）を一番節約できるところです）。
+- 何を「必要な項目」とするかは --google-fields で選べます。
+- 実行後に、問い合わせを省いた件数を表示します。
+"""
+
+import threading
+from typing import Callable, Dict, Iterable, List, Sequence
+
+from .models import BookInfo
+
+
+# 項目名 → 「埋まっているか」の判定
+FIELD_CHECKS: Dict[str, Callable[[BookInfo], bool]] = {
+    "description": lambda i: bool(i.description),
+    "publishers": lambda i: bool(i.publishers),
+    "publish_date": lambda i: bool(i.publish_date),
+    "first_publish_year": lambda i: bool(i.first_publish_year),
+    "isbns": lambda i: bool(i.isbns),
+    "authors": lambda i: bool(i.authors),
+    "subjects": lambda i: bool(i.subjects),
+    "covers": lambda i: all(i.cover_urls.get(s) for s in ("s", "m", "l")),  # S/M/L すべて
+    "cover": lambda i: bool(i.cover_urls),  # どれか1つ
+}
+
+DEFAULT_REQUIRED = ("description", "publishers", "publish_date", "isbns", "authors", "covers")
+
+
+def parse_fields(text: str) -> List[str]:
+    """カンマ区切りの項目名を読み取る（"always" は全件で Google に問い合わせる指定）。"""
+    names = [n.strip() for n in text.split(",") if n.strip()]
+    unknown = [n for n in names if n not in FIELD_CHECKS and n != "always"]
+    if unknown:
+        raise ValueError(f"unknown field(s): {', '.join(unknown)} (choose from {', '.join(FIELD_CHECKS)} or 'always')")
+    return names
+
+
+class EnrichmentPolicy:
+    """必要な項目が欠けているときだけ Google 補完をする、という判定を行う。
+
+    引数:
+    - required: 必要な項目名の並び（FIELD_CHECKS のキー）。"always" を含めると常に補完する
+    """
+
+    def __init__(self, required: Iterable[str] = DEFAULT_REQUIRED) -> None:
+        names = list(required)
+        self.always = "always" in names
+        self.required: Sequence[str] = [n for n in names if n != "always"]
+        unknown = [n for n in self.required if n not in FIELD_CHECKS]
+        if unknown:
+            raise ValueError(f"unknown field(s): {', '.join(unknown)}")
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"checked": 0, "skipped": 0}
+
+    def missing(self, info: BookInfo) -> List[str]:
+        """必要な項目のうち、まだ空のものを返す。"""
+        return [n for n in self.required if not FIELD_CHECKS[n](info)]
+
+    def should_augment(self, info: BookInfo) -> bool:
+        """Google に問い合わせるべきか（必要な項目が欠けていれば True）。省いた件数を数える。"""
+        needed = self.always or bool(self.missing(info))
+        with self._lock:
+            self.stats["checked"] += 1
+            if not needed:
+                self.stats["skipped"] += 1
+        return needed
@@ -3,12 +3,26 @@ from __future__ import annotations
 """カバー画像の保存
 
 指定されたURLから画像データをダウンロードし、指定パスに保存します。
+また、ダウンロード前に「画像が本当にあるか」を軽く確認（プローブ）し、
+S/M/L と取得元（Open Library の ID / ISBN、Google）の中から使えるURLを選びます。
 """
 
 import os
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, Optional
 
-import requests
+from .coverstore import MIN_COVER_BYTES, image_dimensions
+from .openlibrary import OPENLIB_COVER_BASE
+from .utils import TRANSFER, http_request
+
+if TYPE_CHECKING:
+    from .cache import JsonCache
+    from .models import BookInfo
+
+
+PROBE_TTL_AVAILABLE = 30 * 24 * 3600  # 「画像あり」の記録を覚えておく秒数
+PROBE_TTL_MISSING = 24 * 3600  # 「画像なし」の記録を覚えておく秒数
+_SIZE_FALLBACK = {"l": ("l", "m", "s"), "m": ("m", "l", "s"), "s": ("s", "m", "l")}
 
 
 def download_cover(url: str, output_path: str, timeout: int = 30) -> None:
@@ -19,10 +33,116 @@ def download_cover(url: str, output_path: str, timeout: int = 30) -> None:
     - output_path: 保存先ファイルパス（例: covers/xxx_l.jpg）
     - timeout: 通信の待ち時間（秒）
     """
-    with requests.get(url, stream=True, timeout=timeout) as r:
+    with http_request("GET", url, stream=True, timeout=timeout) as r:
         r.raise_for_status()
         os.makedirs(os.path.dirname(os.path.abspath(output_path)) or ".", exist_ok=True)
+        written = 0
         with open(output_path, "wb") as f:
             for chunk in r.iter_content(chunk_size=8192):
                 if chunk:
                     f.write(chunk)
+                    written += len(chunk)
+        TRANSFER.record(r, content_bytes=written)
+
+
+def fetch_cover_bytes(url: str, timeout: int = 30) -> bytes:
+    """カバー画像をファイルに書かず、バイト列のまま取得する（カバーストア用）。"""
+    r = http_request("GET", url, timeout=timeout)
+    r.raise_for_status()
+    return r.content
+
+
+def probe_cover(url: str, timeout: int = 10) -> bool:
+    """画像をダウンロードせずに、そのURLに本物のカバー画像があるかを確かめる。
+
+    まず HEAD で確認し、HEAD に対応していないサーバーには先頭だけの GET（Range）を使います。
+    小さすぎる画像（1x1 のプレースホルダ等）は「なし」とみなします。
+    """
+    r = http_request("HEAD", url, allow_redirects=True, timeout=timeout)
+    if r.status_code in (403, 405, 501):
+        headers = {"Range": "bytes=0-1023"}
+        with http_request("GET", url, headers=headers, stream=True, timeout=timeout) as g:
+            if g.status_code not in (200, 206):
+                return False
+            if not g.headers.get("Content-Type", "image/").startswith("image/"):
+                return False
+            head = g.raw.read(1024)
+            total = (g.headers.get("Content-Range") or "").rpartition("/")[2]
+            if total.isdigit() and int(total) < MIN_COVER_BYTES:
+                return False
+            dims = image_dimensions(head)
+            return not (dims and (dims[0] <= 1 or dims[1] <= 1))
+    if r.status_code != 200:
+        return False
+    if not r.headers.get("Content-Type", "image/").startswith("image/"):
+        return False
+    length = r.headers.get("Content-Length")
+    if length and length.isdigit() and int(length) < MIN_COVER_BYTES:
+        return False
+    return True
+
+
+def cover_url_candidates(info: BookInfo, size: str, max_isbns: int = 3) -> List[str]:
+    """指定サイズのカバーURL候補を、優先順（Open Library ID → ISBN → Google）に並べる。
+
+    Google の画像（google_cover_urls）は、Open Library の URL があっても常に最後の候補に入ります。
+    """
+    url = info.cover_urls.get(size)
+    ol_urls: List[str] = []
+    google_urls: List[str] = []
+    if url:
+        (ol_urls if url.startswith(OPENLIB_COVER_BASE) else google_urls).append(url)
+    for isbn in [i for i in info.isbns if i and len(i) in (10, 13)][:max_isbns]:
+        ol_urls.append(f"{OPENLIB_COVER_BASE}/b/isbn/{isbn}-{size.upper()}.jpg?default=false")
+    if info.google_cover_urls.get(size):
+        google_urls.append(info.google_cover_urls[size])
+    return list(dict.fromkeys(ol_urls + google_urls))
+
+
+def resolve_cover_url(
+    info: BookInfo,
+    size: str,
+    cache: Optional[JsonCache] = None,
+    timeout: int = 10,
+) -> Optional[str]:
+    """実在するカバー画像のURLを選ぶ。見つからなければ None。
+
+    - まず指定サイズの候補を並行してプローブし、優先順で最初に「あり」のものを選ぶ
+    - 指定サイズがどこにも無ければ、近いサイズ（l→m→s など）で同じことを行う
+    - cache を渡すと、プローブ結果（あり/なし）を覚えて次回から通信を省く
+    """
+    for sz in _SIZE_FALLBACK.get(size, (size,)):
+        cands = cover_url_candidates(info, sz)
+        if not cands:
+            continue
+        known = {u: cache.get(f"cover-probe:{u}") for u in cands} if cache else {}
+        todo = [u for u in cands if known.get(u) is None]
+        results = dict(known)
+        first = next((u for u in cands if results.get(u) is not False), None)
+        if first and results.get(first):
+            return first
+        if todo:
+            pool = ThreadPoolExecutor(max_workers=len(todo))
+            futures = {}
+            try:
+                futures = {u: pool.submit(probe_cover, u, timeout) for u in todo}
+                for u in cands:
+                    if results.get(u) is None:
+                        try:
+                            results[u] = futures[u].result()
+                        except Exception:
+                            results[u] = False
+                            continue
+                        if cache:
+                            ttl = PROBE_TTL_AVAILABLE if results[u] else PROBE_TTL_MISSING
+                            cache.set(f"cover-probe:{u}", results[u], ttl)
+                    if results[u]:
+                        break
+            finally:
+                for f in futures.values():
+                    f.cancel()
+                pool.shutdown(wait=False)
+        for u in cands:
+            if results.get(u):
+                return u
+    return None
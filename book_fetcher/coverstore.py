@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+"""カバー画像ストア（重複排除・プレースホルダ除外・縮小版の作成）
+
+非エンジニア向けの要点:
+- 画像の中身（SHA-256）で1つのファイルにまとめ、同じ画像は「ハードリンク」で共有します。
+  Google と Open Library が同じ画像を別URLで返しても、ディスク上は1つ分で済みます。
+- 1x1 の「画像なし」用の小さな画像（プレースホルダ）は保存せずに捨てます。
+- 指定があれば、縮小版（WebP/JPEG）を別スレッドで作ります（Pillow が必要）。
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .utils import set_default_mode
+
+
+MIN_COVER_BYTES = 100  # これより小さい画像はプレースホルダとみなす
+
+_FORMAT_EXT = {"jpeg": ".jpg", "png": ".png", "gif": ".gif", "webp": ".webp"}
+_VARIANT_FORMATS = {"webp": ("WEBP", ".webp"), "jpeg": ("JPEG", ".jpg")}
+_DIGEST_LOCKS = 64  # 同じ画像の書き込みを直列化するロックの数
+
+
+def detect_image_format(data: bytes) -> Optional[str]:
+    """先頭バイトから画像形式（jpeg/png/gif/webp）を判定する。画像でなければ None。"""
+    if data[:3] == b"\xff\xd8\xff":
+        return "jpeg"
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def image_dimensions(data: bytes) -> Optional[Tuple[int, int]]:
+    """画像ヘッダから（幅, 高さ）を読み取る。読み取れなければ None。
+
+    画像全体をデコードせず、ヘッダだけを見るので高速です。
+    """
+    fmt = detect_image_format(data)
+    try:
+        if fmt == "png" and len(data) >= 24:
+            return int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big")
+        if fmt == "gif" and len(data) >= 10:
+            return int.from_bytes(data[6:8], "little"), int.from_bytes(data[8:10], "little")
+        if fmt == "jpeg":
+            i = 2
+            while i + 9 < len(data):
+                if data[i] != 0xFF:
+                    i += 1
+                    continue
+                marker = data[i + 1]
+                if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+                    i += 1 if marker == 0xFF else 2
+                    continue
+                seg_len = int.from_bytes(data[i + 2 : i + 4], "big")
+                if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                    h = int.from_bytes(data[i + 5 : i + 7], "big")
+                    w = int.from_bytes(data[i + 7 : i + 9], "big")
+                    return w, h
+                i += 2 + seg_len
+            return None
+        if fmt == "webp" and len(data) >= 30:
+            chunk = data[12:16]
+            if chunk == b"VP8X":
+                return 1 + int.from_bytes(data[24:27], "little"), 1 + int.from_bytes(data[27:30], "little")
+            if chunk == b"VP8 ":
+                return int.from_bytes(data[26:28], "little") & 0x3FFF, int.from_bytes(data[28:30], "little") & 0x3FFF
+            if chunk == b"VP8L":
+                b = data[21:25]
+                w = 1 + (((b[1] & 0x3F) << 8) | b[0])
+                h = 1 + (((b[3] & 0x0F) << 10) | (b[2] << 2) | ((b[1] & 0xC0) >> 6))
+                return w, h
+    except IndexError:
+        return None
+    return None
+
+
+def is_placeholder_image(data: bytes) -> bool:
+    """「画像なし」を表すプレースホルダ（1x1 画像や極小データ、画像以外）かを判定する。"""
+    if not data or len(data) < MIN_COVER_BYTES:
+        return True
+    if detect_image_format(data) is None:
+        return True
+    dims = image_dimensions(data)
+    if dims and (dims[0] <= 1 or dims[1] <= 1):
+        return True
+    return False
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    """src を dst にハードリンクする。できない環境（別ドライブ等）ではコピーする。"""
+    os.makedirs(os.path.dirname(os.path.abspath(dst)) or ".", exist_ok=True)
+    if os.path.exists(dst):
+        try:
+            if os.path.samefile(src, dst):
+                return
+        except OSError:
+            pass
+    tmp = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.link(src, tmp)
+        os.replace(tmp, dst)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        shutil.copyfile(src, dst)
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    """一時ファイルに書いてから置き換える（並行して同じ画像を書いても壊れない）。"""
+    d = os.path.dirname(path)
+    os.makedirs(d, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=d, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        set_default_mode(tmp)  # ハードリンクした各カバーも同じ権限になる
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class CoverStore:
+    """画像の中身（SHA-256）をキーに保存するカバー画像ストア。
+
+    引数:
+    - root: 実体ファイルを置くディレクトリ（例: covers/.store）
+    - variant_widths: 縮小版の幅（px）一覧。空なら縮小版は作らない
+    - variant_format: 縮小版の形式（webp / jpeg）
+    - workers: 縮小版を作るスレッド数
+    """
+
+    def __init__(
+        self,
+        root: str,
+        variant_widths: Sequence[int] = (),
+        variant_format: str = "webp",
+        workers: int = 4,
+    ) -> None:
+        self.root = os.path.abspath(root)
+        self.variant_widths = sorted({int(w) for w in variant_widths if int(w) > 0})
+        if variant_format not in _VARIANT_FORMATS:
+            raise ValueError(f"Unsupported variant format: {variant_format}")
+        self.variant_format = variant_format
+        if self.variant_widths:
+            try:
+                import PIL.Image  # noqa: F401
+            except ImportError:
+                raise RuntimeError("Pillow is required for cover variants (pip install Pillow)") from None
+        self._executor: Optional[ThreadPoolExecutor] = (
+            ThreadPoolExecutor(max_workers=max(1, workers)) if self.variant_widths else None
+        )
+        self._pending: List[Future] = []
+        self._errors: List[BaseException] = []
+        self._lock = threading.Lock()
+        # 同じ画像の実体・縮小版を2つのスレッドが同時に作ると、後から置き換えた側が
+        # 先に張ったハードリンクを切ってしまう。digest ごとに直列化する（ロック数は固定）
+        self._digest_locks = [threading.Lock() for _ in range(_DIGEST_LOCKS)]
+        self.stats: Dict[str, int] = {"saved": 0, "deduplicated": 0, "placeholders": 0, "variants": 0}
+
+    def _object_path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest + ext)
+
+    def _digest_lock(self, digest: str) -> threading.Lock:
+        return self._digest_locks[int(digest[:8], 16) % _DIGEST_LOCKS]
+
+    def _bump(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def save(self, data: bytes, output_path: str) -> Optional[str]:
+        """画像データを保存し、output_path から参照できるようにする。
+
+        プレースホルダ画像なら何もせず None を返します。
+        戻り値: 実体ファイルのパス
+        """
+        if is_placeholder_image(data):
+            self._bump("placeholders")
+            return None
+        digest = hashlib.sha256(data).hexdigest()
+        ext = _FORMAT_EXT.get(detect_image_format(data) or "", ".jpg")
+        obj = self._object_path(digest, ext)
+        with self._digest_lock(digest):
+            if os.path.exists(obj):
+                self._bump("deduplicated")
+            else:
+                _write_atomic(obj, data)
+        _link_or_copy(obj, output_path)
+        self._bump("saved")
+        if self._executor:
+            with self._lock:
+                for f in self._pending:
+                    if f.done() and f.exception() is not None:
+                        self._errors.append(f.exception())
+                self._pending = [f for f in self._pending if not f.done()]
+                self._pending.append(self._executor.submit(self._make_variants, obj, digest, output_path))
+        return obj
+
+    def _make_variants(self, obj: str, digest: str, output_path: str) -> None:
+        """縮小版を作り、output_path と同じ場所に <名前>_<幅>.<拡張子> でリンクする。"""
+        from PIL import Image
+
+        pil_format, ext = _VARIANT_FORMATS[self.variant_format]
+        stem = os.path.splitext(output_path)[0]
+        for width in self.variant_widths:
+            vpath = os.path.join(self.root, "variants", digest[:2], f"{digest}_{width}{ext}")
+            with self._digest_lock(digest):
+                if not os.path.exists(vpath):
+                    with Image.open(obj) as im:
+                        if im.width > width:
+                            height = max(1, round(im.height * width / im.width))
+                            im = im.resize((width, height), Image.LANCZOS)
+                        if pil_format == "JPEG" and im.mode not in ("RGB", "L"):
+                            im = im.convert("RGB")
+                        os.makedirs(os.path.dirname(vpath), exist_ok=True)
+                        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(vpath), suffix=".tmp")
+                        os.close(fd)
+                        try:
+                            im.save(tmp, format=pil_format, quality=85)
+                            set_default_mode(tmp)
+                            os.replace(tmp, vpath)
+                        finally:
+                            if os.path.exists(tmp):
+                                os.remove(tmp)
+            _link_or_copy(vpath, f"{stem}_{width}{ext}")
+            self._bump("variants")
+
+    def close(self) -> List[BaseException]:
+        """縮小版の作成完了を待ち、失敗した分の例外一覧を返す。"""
+        errors = list(self._errors)
+        if self._executor:
+            for f in self._pending:
+                exc = f.exception()
+                if exc is not None:
+                    errors.append(exc)
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        return errors
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+"""著者・主題のクロール（--crawl-author / --crawl-subject）
+
+非エンジニア向けの要点:
+- 「ある著者の全作品」「ある主題の全作品」を、Open Library の一覧APIからページ単位で読み進めます。
+- 今のページを処理している間に、次のページを先読みします（待ち時間の短縮）。
+- 一度に持つのは「今のページ＋次のページ」だけなので、件数が多くてもメモリは増えません。
+- 状態ファイル（--crawl-state）に「どこまで終わったか」を保存し、中断しても続きから再開できます。
+  状態ファイルも .gz / .zst で終わる名前なら圧縮して保存します。
+"""
+
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from .models import BookCandidate
+from .openlibrary import OPENLIB_BASE, fetch_author_works_page, fetch_subject_works_page, search_authors
+from .utils import http_get, is_transient_error, open_text, set_default_mode
+
+
+PageFetcher = Callable[[int, int], Tuple[List[Dict[str, Any]], Optional[int]]]
+
+
+class CrawlTargetNotFound(LookupError):
+    """クロールの対象（著者）が見つからないことを表す。"""
+
+
+def is_network_error(exc: BaseException) -> bool:
+    """一覧の読み込み中に起きうる通信の失敗か（クロールを中断として扱い、続きから再開できるようにする）。"""
+    if is_transient_error(exc):
+        return True
+    import requests
+
+    return isinstance(exc, requests.RequestException)
+
+
+class CrawlItem(NamedTuple):
+    """クロールで見つけた作品1件。
+
+    - position: 一覧の先頭からの通し番号（再開位置に使う）
+    - candidate: 一覧から分かった作品（取得時はタイトルで検索し直さず、この作品の詳細を取る）
+    """
+
+    position: int
+    title: str
+    author: Optional[str]
+    candidate: BookCandidate
+
+    def __str__(self) -> str:
+        return self.title
+
+
+def _candidate(entry: Dict[str, Any], title: str, author: Optional[str]) -> BookCandidate:
+    """一覧の1件（著者の作品一覧 / 主題の作品一覧）から、検索結果と同じ形の候補を作る。"""
+    covers = [c for c in entry.get("covers") or [] if isinstance(c, int) and c > 0]
+    edition = entry.get("cover_edition_key")
+    return BookCandidate(
+        index=0,
+        title=title,
+        author_names=[author] if author else [],
+        first_publish_year=entry.get("first_publish_year"),
+        work_key=entry.get("key"),
+        edition_keys=[edition] if edition else [],
+        cover_id=entry.get("cover_id") or (covers[0] if covers else None),
+        isbns=[],
+    )
+
+
+def iter_pages(
+    fetch_page: PageFetcher,
+    to_item: Callable[[int, Dict[str, Any]], Optional[CrawlItem]],
+    start: int = 0,
+    page_size: int = 100,
+    limit: Optional[int] = None,
+) -> Iterator[CrawlItem]:
+    """ページ単位の一覧を、次のページを先読みしながら1件ずつ返す。
+
+    - start: 開始位置（再開時は前回の続き）
+    - limit: 最大件数（None なら最後まで）
+    """
+    pool = ThreadPoolExecutor(max_workers=1)
+    produced = 0
+    offset = start
+    future = pool.submit(fetch_page, offset, page_size)
+    try:
+        while future is not None:
+            entries, total = future.result()
+            next_offset = offset + len(entries)
+            more = bool(entries) and (next_offset < total if total is not None else len(entries) >= page_size)
+            if more and (limit is None or produced + len(entries) < limit):
+                future = pool.submit(fetch_page, next_offset, page_size)
+            else:
+                future = None
+            for i, entry in enumerate(entries):
+                if limit is not None and produced >= limit:
+                    return
+                item = to_item(offset + i, entry)
+                if item:
+                    produced += 1
+                    yield item
+            offset = next_offset
+    finally:
+        pool.shutdown(wait=False)
+
+
+def resolve_author(author: str) -> Tuple[str, str]:
+    """著者名または著者キー（OL…A）から、(著者キー, 著者名) を求める。"""
+    key = author.rstrip("/").split("/")[-1]
+    if key.startswith("OL") and key.endswith("A") and key[2:-1].isdigit():
+        data = http_get(f"{OPENLIB_BASE}/authors/{key}.json").json()
+        return key, data.get("name") or data.get("personal_name") or key
+    docs = search_authors(author, limit=1)
+    if not docs or not docs[0].get("key"):
+        raise CrawlTargetNotFound(f"Author not found: {author}")
+    return docs[0]["key"].split("/")[-1], docs[0].get("name") or author
+
+
+def crawl_author(author: str, start: int = 0, page_size: int = 100, limit: Optional[int] = None) -> Iterator[CrawlItem]:
+    """著者の全作品を順に返す。"""
+    key, name = resolve_author(author)
+
+    def to_item(pos: int, entry: Dict[str, Any]) -> Optional[CrawlItem]:
+        title = entry.get("title")
+        return CrawlItem(pos, title, name, _candidate(entry, title, name)) if title else None
+
+    return iter_pages(lambda off, size: fetch_author_works_page(key, off, size), to_item, start, page_size, limit)
+
+
+def crawl_subject(subject: str, start: int = 0, page_size: int = 100, limit: Optional[int] = None) -> Iterator[CrawlItem]:
+    """主題に属する全作品を順に返す。"""
+
+    def to_item(pos: int, entry: Dict[str, Any]) -> Optional[CrawlItem]:
+        title = entry.get("title")
+        authors = [a.get("name") for a in entry.get("authors") or [] if isinstance(a, dict) and a.get("name")]
+        author = authors[0] if authors else None
+        return CrawlItem(pos, title, author, _candidate(entry, title, author)) if title else None
+
+    return iter_pages(lambda off, size: fetch_subject_works_page(subject, off, size), to_item, start, page_size, limit)
+
+
+def load_crawl_state(path: str, mode: str, target: str) -> Tuple[int, bool]:
+    """状態ファイルから (再開位置, 最後まで終わっているか) を読む。対象が違う・ファイルが無い場合は (0, False)。"""
+    try:
+        with open_text(path, "r") as f:
+            state = json.load(f)
+    except (OSError, ValueError, EOFError):
+        return 0, False
+    if not isinstance(state, dict) or state.get("mode") != mode or state.get("target") != target:
+        return 0, False
+    return int(state.get("offset") or 0), bool(state.get("done"))
+
+
+def save_crawl_state(path: str, mode: str, target: str, offset: int, done: bool = False) -> None:
+    """再開位置を状態ファイルに保存する（一時ファイル経由で置き換え）。"""
+    d = os.path.dirname(os.path.abspath(path)) or "."
+    os.makedirs(d, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=d, prefix=".tmp-", suffix="-" + os.path.basename(path))
+    os.close(fd)
+    try:
+        with open_text(tmp, "w") as f:
+            json.dump({"mode": mode, "target": target, "offset": offset, "done": done}, f, ensure_ascii=False)
+        set_default_mode(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
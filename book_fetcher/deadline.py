@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+"""1冊あたりの持ち時間（--deadline）
+
+非エンジニア向けの要点:
+- 1冊の取得にかけてよい時間（例: 10秒）を決め、検索・作品・版・Google の各段階に
+  「残り時間」をタイムアウトとして渡します。
+- 時間切れになった段階は飛ばし、そこまでに分かった情報で結果を返します（部分的な結果）。
+  飛ばした段階は pending_enrichment に記録され、後で --refresh すると取り直します。
+- 1冊が極端に遅くても、順番どおりの出力が止まり続けることがなくなります。
+- 通信のタイムアウトは「応答が止まっている時間」の上限なので、持ち時間をわずかに超えることはあります。
+"""
+
+import time
+from typing import Optional
+
+
+MIN_TIMEOUT = 0.05  # これより残り時間が少なければ、通信せずに時間切れとする（秒）
+
+
+class DeadlineExceeded(Exception):
+    """持ち時間を使い切ったため、通信せずに打ち切ったことを表す。"""
+
+    def __init__(self, budget: float) -> None:
+        self.budget = budget
+        super().__init__(f"deadline of {budget:g}s exceeded")
+
+
+class ShortenedTimeout(float):
+    """残り時間に合わせて既定より短くしたタイムアウト（秒）。
+
+    これで時間切れになっても接続先の障害とは限らないため、サーキットブレーカーは失敗に数えません。
+    """
+
+
+class Deadline:
+    """持ち時間を管理し、各段階に残り時間を渡す。
+
+    引数:
+    - seconds: 持ち時間（秒）。None なら無制限（各段階の既定のタイムアウトのまま）
+    """
+
+    def __init__(self, seconds: Optional[float] = None) -> None:
+        self.budget = seconds
+        self._end = time.monotonic() + seconds if seconds is not None else None
+
+    def remaining(self) -> Optional[float]:
+        """残り時間（秒）。無制限なら None。"""
+        if self._end is None:
+            return None
+        return max(0.0, self._end - time.monotonic())
+
+    def expired(self) -> bool:
+        rem = self.remaining()
+        return rem is not None and rem < MIN_TIMEOUT
+
+    def timeout(self, default: float) -> float:
+        """次の通信に使うタイムアウト（既定値と残り時間の短い方）。時間切れなら DeadlineExceeded。
+
+        残り時間の方が短ければ ShortenedTimeout を返します。
+        """
+        rem = self.remaining()
+        if rem is None:
+            return default
+        if rem < MIN_TIMEOUT:
+            raise DeadlineExceeded(self.budget or 0.0)
+        return ShortenedTimeout(rem) if rem < default else default
@@ -9,7 +9,7 @@ Open Library で不足しがちな「説明文・カテゴリ・出版社・発
 from typing import Any, Dict, List, Optional
 
 from .models import BookInfo
-from .utils import http_get, parse_year_from_date
+from .utils import http_get, is_transient_error, parse_year_from_date
 
 
 GOOGLE_BOOKS_URL = "https://www.googleapis.com/books/v1/volumes"  # 検索API
@@ -61,7 +61,7 @@ def search_googlebooks(
     author: Optional[str] = None,
     isbn: Optional[str] = None,
     api_key: Optional[str] = None,
-    timeout: int = 15,
+    timeout: float = 15,
 ) -> Dict[str, Any]:
     """タイトル/著者/ISBN で Google Books を検索する。"""
     q_parts: List[str] = []
@@ -117,6 +117,7 @@ def build_bookinfo_from_google(item: Dict[str, Any]) -> Optional[BookInfo]:
         description=description,
         subjects=categories,
         cover_urls=cover_urls,
+        google_cover_urls=dict(cover_urls),
     )
 
 
@@ -126,15 +127,21 @@ def augment_with_google(
     authors_query: Optional[List[str]],
     isbns_query: Optional[List[str]],
     api_key: Optional[str] = None,
+    timeout: float = 15,
 ) -> BookInfo:
-    """既存の BookInfo に、Googleから得た不足情報を「空欄埋め」で補完する。"""
+    """既存の BookInfo に、Googleから得た不足情報を「空欄埋め」で補完する。
+
+    Google への通信が一時的に失敗した場合は、info.pending_enrichment に "google" を記録します。
+    """
     isbn = None
     if isbns_query:
         isbn = next((i for i in isbns_query if i and len(i) in (10, 13)), None)
     try:
-        gb = search_googlebooks(title=title, author=(authors_query or [None])[0] if authors_query else None, isbn=isbn, api_key=api_key)
+        gb = search_googlebooks(title=title, author=(authors_query or [None])[0] if authors_query else None, isbn=isbn, api_key=api_key, timeout=timeout)
         item = select_google_item(gb)
-    except Exception:
+    except Exception as e:
+        if is_transient_error(e) and "google" not in info.pending_enrichment:
+            info.pending_enrichment.append("google")
         item = None
     if not item:
         return info
@@ -187,5 +194,6 @@ def augment_with_google(
     g_covers = google_image_links_to_cover_urls(vi.get("imageLinks"))
     for size_key, url in g_covers.items():
         info.cover_urls.setdefault(size_key, url)
+    info.google_cover_urls.update(g_covers)  # Open Library の画像が無かったときの候補として別に残す
 
     return info
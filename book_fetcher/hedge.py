@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+"""ヘッジ（保険）リクエスト
+
+非エンジニア向けの要点:
+- 問い合わせが普段より遅い（直近の応答時間の上位○%より遅い）とき、同じ問い合わせをもう1本送り、
+  先に返ってきた方を使います。まれに極端に遅い応答に引きずられるのを防ぎます。
+- Open Library の検索が遅いときは、Google Books の検索を先回りして並行で始めます（競争）。
+  Open Library で見つかればそちらを優先し、見つからなければ Google の結果を使います。
+- 余分なリクエストは全体の一定割合（既定10%）までに抑えます。
+- 負けた方は結果を捨てます（送信済みの通信は途中で止められないため、完了まで待たずに無視します）。
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+
+class LatencyTracker:
+    """問い合わせ先ごとに、直近の応答時間を覚えておく。
+
+    引数:
+    - window: 覚えておく件数
+    - min_samples: これより少ない間は percentile を計算しない
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20) -> None:
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, name: str, pct: float) -> Optional[float]:
+        """直近の応答時間の pct パーセンタイル（秒）。件数が足りなければ None。"""
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if len(samples) < self.min_samples:
+            return None
+        idx = min(len(samples) - 1, int(len(samples) * pct / 100.0))
+        return samples[idx]
+
+
+class Hedger:
+    """遅い問い合わせに保険のリクエストを重ねて、待ち時間のばらつき（裾）を減らす。
+
+    引数:
+    - percentile: この順位より遅ければ保険を送る（例: 95 → 直近の95パーセンタイル）
+    - max_extra_ratio: 余分なリクエストの上限（通常のリクエスト数に対する割合）
+    - default_delay: 応答時間の記録が少ない間に使う待ち時間（秒）
+    - min_delay: 保険を送るまでの最短の待ち時間（秒）
+    - max_workers: 内部で使うスレッド数の上限
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        max_extra_ratio: float = 0.1,
+        default_delay: float = 2.0,
+        min_delay: float = 0.1,
+        max_workers: int = 64,
+    ) -> None:
+        self.percentile = percentile
+        self.max_extra_ratio = max_extra_ratio
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.latency = LatencyTracker()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"primary": 0, "extra": 0, "hedge_wins": 0, "race_wins": 0}
+
+    def delay(self, name: str) -> float:
+        """保険を送るまでの待ち時間（秒）。"""
+        p = self.latency.percentile(name, self.percentile)
+        return max(self.min_delay, p if p is not None else self.default_delay)
+
+    def _take_extra(self) -> bool:
+        """余分なリクエストの枠が残っていれば1つ使う。"""
+        with self._lock:
+            if self.stats["extra"] + 1 > self.stats["primary"] * self.max_extra_ratio:
+                return False
+            self.stats["extra"] += 1
+            return True
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _timed(self, name: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        def run() -> Any:
+            # 失敗（時間切れなど）にかかった時間も数える。成功だけだと遅い側が抜け、基準が短くなりすぎる
+            start = time.monotonic()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.latency.add(name, time.monotonic() - start)
+
+        return self._pool.submit(run)
+
+    def call(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        make_timeout: Optional[Callable[[], float]] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """fn を実行し、遅ければ同じ呼び出しをもう1本送って、先に成功した方を返す。
+
+        - make_timeout: 渡すと、リクエストを送るたびに呼んで fn の timeout に渡す
+          （保険のリクエストには、待った分だけ短くなった残り時間が渡る。失敗すれば保険は送らない）
+        """
+
+        def with_timeout() -> Dict[str, Any]:
+            return dict(kwargs, timeout=make_timeout()) if make_timeout else kwargs
+
+        self._count("primary")
+        first = self._timed(name, fn, *args, **with_timeout())
+        done, _ = wait([first], timeout=self.delay(name))
+        if done:
+            return first.result()
+        try:
+            hedge_kwargs = with_timeout()
+        except Exception:  # 持ち時間を使い切った
+            return first.result()
+        if not self._take_extra():
+            return first.result()
+        second = self._timed(name, fn, *args, **hedge_kwargs)
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                if f.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if f is second:
+                        self._count("hedge_wins")
+                    return f.result()
+                error = f.exception()
+        assert error is not None
+        raise error
+
+    def race(
+        self,
+        name: str,
+        primary: Callable[[], Any],
+        fallback: Callable[[], Any],
+        accept: Callable[[Any], bool],
+    ) -> Tuple[str, Any]:
+        """primary を優先しつつ、遅ければ fallback を並行して始める。
+
+        - primary の結果が accept を満たせば ("primary", 結果)
+        - 満たさない・失敗した場合、先回りしていれば ("fallback", fallback の結果)
+          （primary が失敗し、fallback の結果も None なら primary の例外を送出する）
+        - 先回りしていなければ ("primary", 結果) をそのまま返す（呼び出し側で通常どおり代替処理）
+        - race_wins は、fallback の結果（None 以外）を使った回数
+        """
+        self._count("primary")
+        first = self._timed(name, primary)
+        done, _ = wait([first], timeout=self.delay(name))
+        if done or not self._take_extra():
+            return "primary", first.result()
+        spec = self._pool.submit(fallback)
+        error: Optional[Exception] = None
+        try:
+            result = first.result()
+            if accept(result):
+                spec.cancel()
+                return "primary", result
+        except Exception as e:
+            error = e
+        fallback_result = spec.result()
+        if fallback_result is None:
+            if error is not None:
+                raise error
+        else:
+            self._count("race_wins")
+        return "fallback", fallback_result
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False)
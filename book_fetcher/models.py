@@ -6,9 +6,10 @@ from __future__ import annotations
 非エンジニアの方向けの要点:
 - BookCandidate: 検索直後の「候補の本」。確定前の軽い情報。
 - BookInfo: 1冊の本としてまとめた最終情報（画面表示・保存に使う）。
+- bookinfo_from_dict: 保存済みのJSON（辞書）から BookInfo に戻す。
 """
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from typing import Any, Dict, List, Optional
 
 
@@ -53,6 +54,11 @@ class BookInfo:
     - subjects: 主題（カテゴリ）
     - cover_urls: カバー画像のURL（s/m/l）
     - amazon_urls: Amazon の商品/検索リンク
+    - query: 検索に使った入力タイトル（--refresh で元の入力と結び付けるため）
+    - fetched_at: 取得日時（UTC, ISO 8601）
+    - pending_enrichment: 一時的な失敗で取れなかった情報源（work / edition / google）。
+      空でなければ「部分的な結果」で、--refresh で取り直されます
+    - google_cover_urls: Google Books のカバー画像URL（s/m/l）。--probe-covers で Open Library の画像が無いときの候補
     """
 
     title: str
@@ -68,3 +74,21 @@ class BookInfo:
     subjects: List[str]
     cover_urls: Dict[str, str]
     amazon_urls: Dict[str, str] = field(default_factory=dict)
+    query: Optional[str] = None
+    fetched_at: Optional[str] = None
+    pending_enrichment: List[str] = field(default_factory=list)
+    google_cover_urls: Dict[str, str] = field(default_factory=dict)
+
+
+def bookinfo_from_dict(data: Dict[str, Any]) -> Optional[BookInfo]:
+    """保存済みの辞書（JSONの1件分）から BookInfo を作り直す。
+
+    知らない項目は無視し、必須項目が欠けている場合は None を返します。
+    """
+    if not isinstance(data, dict):
+        return None
+    names = {f.name for f in fields(BookInfo)}
+    try:
+        return BookInfo(**{k: v for k, v in data.items() if k in names})
+    except TypeError:
+        return None
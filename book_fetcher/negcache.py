@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+"""「見つからなかった」「失敗した」タイトルの記録（ネガティブキャッシュ）
+
+非エンジニア向けの要点:
+- 見つからなかったタイトルやエラーになったタイトルを覚えておき、
+  しばらくの間は問い合わせずにスキップします（APIの回数制限を節約）。
+- 再確認までの間隔は、続けて見つからないたびに2倍に伸びます（上限あり）。
+- 「見つからない」と「一時的なエラー」は別々の間隔で扱います（エラーは短め）。
+- Google Books を併用したかどうかは別々に記録します（Open Library だけで見つからなくても、併用すれば見つかることがあるため）。
+"""
+
+import json
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .cache import JsonCache
+
+
+DEFAULT_MISS_TTL = 24 * 3600  # 見つからなかった場合の最初の再確認間隔（秒）
+DEFAULT_ERROR_TTL = 30 * 60  # エラーだった場合の最初の再確認間隔（秒）
+DEFAULT_MAX_INTERVAL = 30 * 24 * 3600  # 再確認間隔の上限（秒）
+
+
+class NegativeCacheHit(Exception):
+    """記録済みのため、今回は問い合わせずにスキップしたことを表す。"""
+
+    def __init__(self, kind: str, next_check: float) -> None:
+        self.kind = kind
+        self.next_check = next_check
+        until = time.strftime("%Y-%m-%d %H:%M", time.localtime(next_check))
+        label = "not found" if kind == "miss" else "failed"
+        super().__init__(f"previously {label}; retry after {until}")
+
+
+class NegativeCache:
+    """見つからない/失敗したタイトルを、指数的に伸びる間隔で記録する。
+
+    引数:
+    - cache: 保存先のキャッシュ
+    - miss_ttl: 見つからなかった場合の最初の間隔（秒）
+    - error_ttl: エラーだった場合の最初の間隔（秒）
+    - max_interval: 間隔の上限（秒）
+    - use_google: Google Books も併用して取得しているか（記録を分けるため）
+    """
+
+    def __init__(
+        self,
+        cache: JsonCache,
+        miss_ttl: float = DEFAULT_MISS_TTL,
+        error_ttl: float = DEFAULT_ERROR_TTL,
+        max_interval: float = DEFAULT_MAX_INTERVAL,
+        use_google: bool = False,
+    ) -> None:
+        self.cache = cache
+        self.base = {"miss": miss_ttl, "error": error_ttl}
+        self.max_interval = max_interval
+        self.sources = ["openlibrary", "google"] if use_google else ["openlibrary"]
+        self._lock = threading.Lock()
+        self.skipped = 0
+
+    def _key(self, title: str, author: Optional[str], year: Optional[int]) -> str:
+        return "negative:" + json.dumps([" ".join(title.split()).casefold(), author, year, self.sources], ensure_ascii=False)
+
+    def check(self, title: str, author: Optional[str] = None, year: Optional[int] = None) -> None:
+        """再確認の時期が来ていなければ NegativeCacheHit を送出する。"""
+        entry: Optional[Dict[str, Any]] = self.cache.get(self._key(title, author, year))
+        if entry and entry.get("next", 0) > time.time():
+            with self._lock:
+                self.skipped += 1
+            raise NegativeCacheHit(entry.get("kind", "miss"), entry["next"])
+
+    def record(self, kind: str, title: str, author: Optional[str] = None, year: Optional[int] = None) -> None:
+        """見つからなかった（kind="miss"）/ 失敗した（kind="error"）ことを記録する。"""
+        key = self._key(title, author, year)
+        prev = self.cache.get(key) or {}
+        count = prev.get("count", 0) + 1 if prev.get("kind") == kind else 1
+        interval = min(self.base[kind] * (2 ** (count - 1)), self.max_interval)
+        entry = {"kind": kind, "count": count, "next": time.time() + interval}
+        # 回数を覚えておくため、記録自体は間隔の上限の2倍まで残す
+        self.cache.set(key, entry, ttl=self.max_interval * 2)
+
+    def clear(self, title: str, author: Optional[str] = None, year: Optional[int] = None) -> None:
+        """見つかったタイトルの記録を消す。"""
+        self.cache.delete(self._key(title, author, year))
@@ -5,7 +5,7 @@ from __future__ import annotations
 Open Library（無料・APIキー不要）の検索や詳細取得を担当します。
 """
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from .models import BookCandidate
 from .utils import http_get
@@ -14,6 +14,7 @@ from .utils import http_get
 OPENLIB_SEARCH_URL = "https://openlibrary.org/search.json"  # 検索APIのURL
 OPENLIB_BASE = "https://openlibrary.org"  # ページや詳細APIのベースURL
 OPENLIB_COVER_BASE = "https://covers.openlibrary.org"  # カバー画像のベースURL
+OPENLIB_AUTHOR_SEARCH_URL = "https://openlibrary.org/search/authors.json"  # 著者検索APIのURL
 
 
 def search_openlibrary(
@@ -21,6 +22,7 @@ def search_openlibrary(
     author: Optional[str] = None,
     year: Optional[int] = None,
     limit: int = 5,
+    timeout: float = 15,
 ) -> List[BookCandidate]:
     """タイトル（と任意で著者・年）で本を検索し、候補一覧を返す。"""
     params = {"title": title, "limit": limit}
@@ -29,7 +31,7 @@ def search_openlibrary(
     if year:
         params["first_publish_year"] = year
 
-    res = http_get(OPENLIB_SEARCH_URL, params=params)
+    res = http_get(OPENLIB_SEARCH_URL, params=params, timeout=timeout)
     data = res.json()
     docs = data.get("docs", [])
     candidates: List[BookCandidate] = []
@@ -49,16 +51,42 @@ def search_openlibrary(
     return candidates
 
 
-def fetch_work_details(work_key: str) -> Dict[str, Any]:
+def fetch_work_details(work_key: str, timeout: float = 15) -> Dict[str, Any]:
     """作品（work）の詳細JSONを取得する（例: /works/OL…W）。"""
     url = f"{OPENLIB_BASE}{work_key}.json"
-    return http_get(url).json()
+    return http_get(url, timeout=timeout).json()
 
 
-def fetch_edition_details(edition_key: str) -> Dict[str, Any]:
+def fetch_edition_details(edition_key: str, timeout: float = 15) -> Dict[str, Any]:
     """版（edition）の詳細JSONを取得する（例: OL…M）。"""
     url = f"{OPENLIB_BASE}/books/{edition_key}.json"
-    return http_get(url).json()
+    return http_get(url, timeout=timeout).json()
+
+
+def search_authors(name: str, limit: int = 5) -> List[Dict[str, Any]]:
+    """著者名で著者を検索し、著者情報（key, name など）の一覧を返す。"""
+    res = http_get(OPENLIB_AUTHOR_SEARCH_URL, params={"q": name, "limit": limit})
+    return res.json().get("docs", []) or []
+
+
+def fetch_author_works_page(author_key: str, offset: int = 0, limit: int = 50) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """著者の作品一覧を1ページ分取得する（例: OL23919A）。
+
+    戻り値: (作品の一覧, 全件数（分かれば）)
+    """
+    key = author_key.rstrip("/").split("/")[-1]
+    data = http_get(f"{OPENLIB_BASE}/authors/{key}/works.json", params={"limit": limit, "offset": offset}).json()
+    return data.get("entries", []) or [], data.get("size")
+
+
+def fetch_subject_works_page(subject: str, offset: int = 0, limit: int = 50) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """主題（subject）に属する作品一覧を1ページ分取得する（例: science_fiction）。
+
+    戻り値: (作品の一覧, 全件数（分かれば）)
+    """
+    slug = "_".join(subject.strip().lower().split())
+    data = http_get(f"{OPENLIB_BASE}/subjects/{slug}.json", params={"limit": limit, "offset": offset}).json()
+    return data.get("works", []) or [], data.get("work_count")
 
 
 def build_cover_urls(
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+"""バッチ処理のパイプライン
+
+非エンジニア向けの要点:
+- 入力（ファイル / 標準入力 / .gz 圧縮ファイル）を1行ずつ読み、全部を先に読み込みません。
+- 複数の作業スレッドで並行処理しつつ、結果は入力と同じ順番で返します。
+- 処理中の件数に上限（ウィンドウ）を設け、入力を読み進めすぎないようにします（背圧）。
+"""
+
+import sys
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import IO, Callable, Deque, Iterable, Iterator, Optional, Tuple, TypeVar
+
+from .utils import open_text
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def _iter_title_lines(f: IO[str], close: bool) -> Iterator[str]:
+    """1行1タイトルとして読み、空行と#行を除く。"""
+    try:
+        for line in f:
+            s = line.strip()
+            if s and not s.startswith("#"):
+                yield s
+    finally:
+        if close:
+            f.close()
+
+
+def open_titles(path: str) -> Iterator[str]:
+    """入力（1行1タイトル）を少しずつ読むイテレータを返す。
+
+    - path が "-" なら標準入力から読む（他のコマンドからパイプで渡せる）
+    - 拡張子が .gz なら gzip を展開しながら読む
+    ファイルを開けない場合はこの時点で OSError になります。
+    """
+    if path == "-":
+        return _iter_title_lines(sys.stdin, close=False)
+    return _iter_title_lines(open_text(path, "r"), close=True)
+
+
+def run_ordered(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    workers: int = 1,
+    window: Optional[int] = None,
+) -> Iterator[Tuple[T, Optional[R], Optional[BaseException]]]:
+    """items の各要素に func を適用し、(要素, 結果, 例外) を入力順で返す。
+
+    - workers が1以下なら、スレッドを使わずその場で順番に処理する
+    - window は同時に処理中にしておける最大件数（既定: workers の2倍）。
+      これを超えて入力を読み進めないので、メモリには処理中の分しか載りません。
+    """
+    if workers <= 1:
+        for item in items:
+            try:
+                yield item, func(item), None
+            except Exception as e:
+                yield item, None, e
+        return
+
+    limit = max(1, window or workers * 2)
+    pending: Deque[Tuple[T, Future]] = deque()
+
+    def pop() -> Tuple[T, Optional[R], Optional[BaseException]]:
+        item, fut = pending.popleft()
+        exc = fut.exception()
+        return item, (None if exc else fut.result()), exc
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for item in items:
+            pending.append((item, pool.submit(func, item)))
+            if len(pending) >= limit:
+                yield pop()
+        while pending:
+            yield pop()
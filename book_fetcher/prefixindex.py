@@ -0,0 +1,400 @@
+from __future__ import annotations
+
+"""入力途中の文字列から候補を引く前方一致インデックス（--index / --build-index）
+
+非エンジニア向けの要点:
+- これまでに取得した本（結果ファイル）と、キャッシュに残っている検索結果から、
+  「タイトル・著者名の書き出し」で引ける索引ファイルを作ります。
+- 索引は並べ替え済みの固定長の表なので、ファイルをメモリに割り当てて（mmap）二分探索するだけで引けます
+  （ファイル全体を読み込まないため、大きくても起動が速い）。
+- 文字は NFKC で正規化し（全角英数・半角カナ・互換漢字などをそろえる）、大文字小文字を区別せず、
+  カタカナはひらがなにそろえます（「ノルウェイ」でも「のるうぇい」でも引ける）。
+- 単語の途中からでも引けます。日本語（かな・漢字）は区切りが無いので、どの文字からでも引けます。
+- 1〜2文字の入力（"t" など）で当たる見出しが多い場合に備え、上位の本の一覧を作成時に用意しておきます。
+- 索引で見つからないときだけ、Open Library に問い合わせます。
+"""
+
+import bisect
+import heapq
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+import unicodedata
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from .models import BookCandidate, BookInfo, bookinfo_from_dict
+from .openlibrary import search_openlibrary
+from .utils import set_default_mode
+
+if TYPE_CHECKING:
+    from .cache import JsonCache
+
+
+MAGIC = b"BFPX"
+VERSION = 2
+# magic, version, 本の数, 見出しの数, 本の位置表, 本の本文, 見出し文字列, 見出し表, 短い入力の数, 短い入力の表, 上位の一覧
+_HEADER = "<4sIIIQQQQIQQ"
+_REC = "<QI"  # 本の本文の位置と長さ
+_ENTRY = "<IHIB"  # 見出し文字列の位置・長さ, 本の番号, 見出しの種類
+_SHORT = "<8sQI"  # 短い入力（0埋め）, 上位の一覧の位置（何件目から）, 件数
+HEADER_SIZE = 68
+REC_SIZE = 12
+ENTRY_SIZE = 11
+SHORT_SIZE = 20
+
+MAX_KEY_CHARS = 64  # 見出しの最大長（これより長い入力は先頭だけで引く）
+MAX_INFIX_KEYS = 48  # 日本語の「途中から」見出しを1件あたり何個まで作るか
+MAX_HITS = 1000  # 1回の検索で、順位の高い方から残す見出しの数
+SHORT_PREFIX_CHARS = 2  # この文字数までの入力には、上位の本の一覧を作成時に用意する
+SHORT_MIN_ENTRIES = 2000  # 当たる見出しがこれより多い短い入力だけ用意する（少なければその場で調べても速い）
+CANDIDATES_TTL = 24 * 3600  # 問い合わせた候補をキャッシュに残す秒数
+
+# 見出しの種類（小さいほど上位）。MIXED は「複数の語が離れた位置で一致」
+TITLE, TITLE_WORD, TITLE_INFIX, AUTHOR, AUTHOR_WORD, AUTHOR_INFIX, MIXED = range(7)
+
+_SEPARATORS = re.compile(r"[^\w]+|_+")
+
+
+def _score(q_len: int, length: int, rid: int, kind: int) -> int:
+    """見出しの一致の順位（小さいほど上位）。一致の段階（0: タイトル完全一致, 1〜: 見出しの種類）× 2**32 + 本の番号"""
+    return (0 if kind == TITLE and length == q_len else kind + 1) << 32 | rid
+
+
+def _top_hits(q_len: int, entries: Iterable[Tuple[int, int, int]]) -> Dict[int, int]:
+    """(見出しの長さ, 本の番号, 種類) の並びから、順位の高い MAX_HITS 件を本ごとにまとめて返す。"""
+    best: Dict[int, int] = {}
+    for score in heapq.nsmallest(MAX_HITS, (_score(q_len, length, rid, kind) for length, rid, kind in entries)):
+        best.setdefault(score & 0xFFFFFFFF, score)  # 小さい順なので、最初に出たものが本ごとの一番よい一致
+    return best
+
+
+def _is_cjk(ch: str) -> bool:
+    o = ord(ch)
+    return 0x3040 <= o <= 0x30FF or 0x3400 <= o <= 0x9FFF or 0xF900 <= o <= 0xFAFF
+
+
+def normalize(text: str) -> str:
+    """検索用に文字をそろえる（NFKC・大文字小文字・カタカナ→ひらがな・記号は空白に）。"""
+    s = unicodedata.normalize("NFKC", text).casefold()
+    s = "".join(chr(ord(c) - 0x60) if "ァ" <= c <= "ヶ" else c for c in s)
+    return " ".join(_SEPARATORS.sub(" ", s).split())
+
+
+def _keys(text: str, whole: int, word: int, infix: int) -> List[Tuple[str, int]]:
+    """1つの文字列から見出し（と種類）を作る。"""
+    s = normalize(text)
+    if not s:
+        return []
+    out = [(s[:MAX_KEY_CHARS], whole)]
+    infixes = 0
+    for i in range(1, len(s)):
+        if s[i] == " ":
+            continue
+        if s[i - 1] == " ":
+            out.append((s[i:i + MAX_KEY_CHARS], word))
+        elif infixes < MAX_INFIX_KEYS and _is_cjk(s[i]):
+            infixes += 1
+            out.append((s[i:i + MAX_KEY_CHARS], infix))
+    return out
+
+
+def _cover_id(cover_urls: Dict[str, str]) -> Optional[int]:
+    m = re.search(r"/b/id/(\d+)-", cover_urls.get("l") or cover_urls.get("m") or cover_urls.get("s") or "")
+    return int(m.group(1)) if m else None
+
+
+def candidate_from_info(info: BookInfo) -> Dict[str, Any]:
+    """取得済みの BookInfo を、索引に入れる候補（辞書）にする。"""
+    return {
+        "title": info.title,
+        "author_names": list(info.authors),
+        "first_publish_year": info.first_publish_year,
+        "work_key": info.openlibrary_work_key,
+        "edition_keys": [info.openlibrary_edition_key] if info.openlibrary_edition_key else [],
+        "cover_id": _cover_id(info.cover_urls),
+        "isbns": list(info.isbns),
+    }
+
+
+def cached_candidates(cache: JsonCache) -> Iterable[Tuple[Dict[str, Any], bool]]:
+    """キャッシュに残っている取得結果・検索結果を (候補, 取得済みか) の形で返す。"""
+    for key, value in cache.items():
+        if not key.startswith("[") or not value:
+            continue
+        try:
+            kind = json.loads(key)[0]
+        except (ValueError, IndexError):
+            continue
+        if kind == "book" and isinstance(value, dict):
+            info = bookinfo_from_dict(value)
+            if info:
+                yield candidate_from_info(info), True
+        elif kind == "candidates" and isinstance(value, list):
+            for c in value:
+                if isinstance(c, dict) and c.get("title"):
+                    yield c, False
+
+
+def build_index(sources: Iterable[Tuple[Dict[str, Any], bool]], path: str) -> int:
+    """候補の並びから索引ファイルを作る。戻り値は収録した本の数。
+
+    - sources: (候補の辞書, 取得済みか) の並び。同じ作品は1件にまとめ、取得済み・出現回数の多いものを上位にする
+    """
+    records: List[Dict[str, Any]] = []
+    ids: Dict[str, int] = {}
+    for cand, resolved in sources:
+        title = cand.get("title")
+        if not title:
+            continue
+        ident = cand.get("work_key") or json.dumps([normalize(title), [normalize(a) for a in cand.get("author_names") or []]])
+        rid = ids.get(ident)
+        if rid is None:
+            ids[ident] = len(records)
+            rec = {k: cand.get(k) for k in ("title", "author_names", "first_publish_year", "work_key", "edition_keys", "cover_id", "isbns")}
+            rec["author_names"] = rec["author_names"] or []
+            rec["edition_keys"] = rec["edition_keys"] or []
+            rec["isbns"] = rec["isbns"] or []
+            rec["weight"] = 0
+            records.append(rec)
+            rid = len(records) - 1
+        # 取得済みの本は検索結果に出てきただけの本より常に上位
+        records[rid]["weight"] += 1000 if resolved else 1
+    # 本の番号を「重い・タイトルが短い」順に振り直す（検索時は番号順に並べるだけで済む）
+    records.sort(key=lambda r: (-r["weight"], len(r["title"])))
+
+    entries: List[Tuple[bytes, int, int]] = []
+    for rid, rec in enumerate(records):
+        keys = _keys(rec["title"], TITLE, TITLE_WORD, TITLE_INFIX)
+        for name in rec["author_names"]:
+            keys.extend(_keys(name, AUTHOR, AUTHOR_WORD, AUTHOR_INFIX))  # 「春樹」でも「村上春樹」を引ける
+        for key, kind in set(keys):
+            entries.append((key.encode("utf-8"), rid, kind))
+    entries.sort()
+
+    # 当たる見出しが多い短い入力には、上位の本の一覧（順位の昇順）を用意しておく
+    sorted_keys = [k for k, _, _ in entries]
+    prefixes = {s[:n].encode("utf-8") for s in {k.decode("utf-8") for k in sorted_keys} for n in range(1, SHORT_PREFIX_CHARS + 1) if len(s) >= n}
+    shorts: List[Tuple[bytes, List[int]]] = []
+    for p in sorted(prefixes):
+        lo = bisect.bisect_left(sorted_keys, p)
+        hi = bisect.bisect_left(sorted_keys, p + b"\xff")
+        if hi - lo > SHORT_MIN_ENTRIES:
+            best = _top_hits(len(p), ((len(k), rid, kind) for k, rid, kind in entries[lo:hi]))
+            shorts.append((p, sorted(best.values())))
+
+    d = os.path.dirname(os.path.abspath(path)) or "."
+    os.makedirs(d, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=d, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            blobs = [json.dumps(r, ensure_ascii=False, separators=(",", ":")).encode("utf-8") for r in records]
+            rec_index_off = HEADER_SIZE
+            rec_blob_off = rec_index_off + REC_SIZE * len(blobs)
+            key_blob_off = rec_blob_off + sum(len(b) for b in blobs)
+            entry_off = key_blob_off + sum(len(k) for k, _, _ in entries)
+            short_off = entry_off + ENTRY_SIZE * len(entries)
+            postings_off = short_off + SHORT_SIZE * len(shorts)
+            f.write(
+                struct.pack(
+                    _HEADER, MAGIC, VERSION, len(records), len(entries), rec_index_off, rec_blob_off, key_blob_off, entry_off,
+                    len(shorts), short_off, postings_off,
+                )
+            )
+            pos = 0
+            for b in blobs:
+                f.write(struct.pack(_REC, pos, len(b)))
+                pos += len(b)
+            for b in blobs:
+                f.write(b)
+            for k, _, _ in entries:
+                f.write(k)
+            pos = 0
+            for k, rid, kind in entries:
+                f.write(struct.pack(_ENTRY, pos, len(k), rid, kind))
+                pos += len(k)
+            pos = 0
+            for p, scores in shorts:
+                f.write(struct.pack(_SHORT, p, pos, len(scores)))
+                pos += len(scores)
+            for _, scores in shorts:
+                f.write(struct.pack(f"<{len(scores)}Q", *scores))
+        set_default_mode(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return len(records)
+
+
+class PrefixIndex:
+    """索引ファイルを開いて、入力途中の文字列から候補を引く。
+
+    引数:
+    - path: build_index で作った索引ファイル
+    """
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # 空のファイル
+            self._file.close()
+            raise ValueError(f"Not a prefix index: {path}")
+        if len(self._mm) < HEADER_SIZE:
+            self.close()
+            raise ValueError(f"Not a prefix index: {path}")
+        magic, version = struct.unpack_from("<4sI", self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Not a prefix index: {path}")
+        if version != VERSION or len(self._mm) < HEADER_SIZE:
+            self.close()
+            raise ValueError(f"{path}: made by another version of book_fetcher; rebuild it with --build-index")
+        (
+            _, _, self.size, self._n, self._rec_index, self._rec_blob, self._key_blob, self._entries,
+            self._n_short, self._short, self._postings,
+        ) = struct.unpack_from(_HEADER, self._mm, 0)
+
+    def close(self) -> None:
+        self._mm.close()
+        self._file.close()
+
+    def _entry(self, i: int) -> Tuple[bytes, int, int]:
+        off, length, rid, kind = struct.unpack_from(_ENTRY, self._mm, self._entries + ENTRY_SIZE * i)
+        start = self._key_blob + off
+        return self._mm[start:start + length], rid, kind
+
+    def _record(self, rid: int) -> Dict[str, Any]:
+        off, length = struct.unpack_from(_REC, self._mm, self._rec_index + REC_SIZE * rid)
+        start = self._rec_blob + off
+        return json.loads(self._mm[start:start + length])
+
+    def _lower_bound(self, q: bytes) -> int:
+        lo, hi = 0, self._n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] < q:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _short_hits(self, q: bytes) -> Optional[Dict[int, int]]:
+        """作成時に用意した短い入力の上位一覧を引く（用意が無ければ None）。"""
+        if len(q) > 8 or len(q.decode("utf-8")) > SHORT_PREFIX_CHARS:
+            return None
+        padded = q.ljust(8, b"\0")
+        lo, hi = 0, self._n_short
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if struct.unpack_from("<8s", self._mm, self._short + SHORT_SIZE * mid)[0] < padded:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self._n_short:
+            return None
+        key, pos, count = struct.unpack_from(_SHORT, self._mm, self._short + SHORT_SIZE * lo)
+        if key != padded:
+            return None
+        scores = struct.unpack_from(f"<{count}Q", self._mm, self._postings + 8 * pos)
+        return {score & 0xFFFFFFFF: score for score in scores}
+
+    def _scan(self, q: bytes) -> Dict[int, int]:
+        """q で始まる見出しを調べ、本ごとに一番よい一致の順位（小さいほど上位、_score を参照）を返す。
+
+        見出しは文字列の順に並んでいるため、一致する見出しはすべて調べて順位の高い MAX_HITS 件を残します
+        （"t" のような短い入力でも、取得済みの上位の本が途中で打ち切られない）。
+        当たる見出しが多い短い入力は、作成時に用意した一覧を使います。
+        """
+        best = self._short_hits(q)
+        if best is not None:
+            return best
+        lo = self._lower_bound(q)
+        hi = self._lower_bound(q + b"\xff")  # UTF-8 に 0xFF は現れない
+        with memoryview(self._mm) as mv:
+            block = mv[self._entries + ENTRY_SIZE * lo:self._entries + ENTRY_SIZE * hi]
+            best = _top_hits(len(q), ((length, rid, kind) for _, length, rid, kind in struct.iter_unpack(_ENTRY, block)))
+            block.release()
+        return best
+
+    def search(self, text: str, author: Optional[str] = None, year: Optional[int] = None, limit: int = 5) -> List[BookCandidate]:
+        """入力途中の文字列に合う候補を、よく合う順に返す（見つからなければ空）。
+
+        - 順位: タイトルが完全一致 > タイトルの書き出し > 単語の書き出し > 途中 > 著者名（書き出し > 単語 > 途中） > 離れた語の一致、
+          同じ順位なら取得済み・よく出てくる本、短いタイトルの順
+        - 本文（JSON）は、上位から順に必要な件数だけ読む
+        """
+        q = normalize(text)[:MAX_KEY_CHARS]
+        if not q:
+            return []
+        best = self._scan(q.encode("utf-8"))
+        tokens = q.split()
+        records: Dict[int, Dict[str, Any]] = {}
+        if len(tokens) > 1 and len(best) < limit:
+            # 語の間に別の語がある入力（例: "potter cha"）: 一番長い語で引き、残りの語は本文で確かめる
+            for rid in self._scan(max(tokens, key=len).encode("utf-8")):
+                if rid in best:
+                    continue
+                rec = self._record(rid)
+                hay = normalize(" ".join([rec["title"], *rec["author_names"]]))
+                if all(t in hay for t in tokens):
+                    best[rid] = (MIXED + 1) << 32 | rid
+                    records[rid] = rec
+
+        want_author = normalize(author) if author else None
+        out: List[BookCandidate] = []
+        for score in sorted(best.values()):
+            rid = score & 0xFFFFFFFF
+            rec = records.get(rid) or self._record(rid)
+            if year and rec.get("first_publish_year") != year:
+                continue
+            if want_author and not any(want_author in normalize(a) for a in rec["author_names"]):
+                continue
+            out.append(
+                BookCandidate(
+                    index=len(out),
+                    title=rec["title"],
+                    author_names=rec["author_names"],
+                    first_publish_year=rec.get("first_publish_year"),
+                    work_key=rec.get("work_key"),
+                    edition_keys=rec["edition_keys"],
+                    cover_id=rec.get("cover_id"),
+                    isbns=rec["isbns"],
+                )
+            )
+            if len(out) >= limit:
+                break
+        return out
+
+
+def search_candidates(
+    title: str,
+    author: Optional[str] = None,
+    year: Optional[int] = None,
+    limit: int = 5,
+    index: Optional[PrefixIndex] = None,
+    cache: Optional[JsonCache] = None,
+) -> Tuple[List[BookCandidate], str]:
+    """索引 → キャッシュ → Open Library の順に候補を探す。
+
+    戻り値: (候補一覧, どこから返したか: "index" / "cache" / "network")。
+    問い合わせた結果はキャッシュに残し、次回の索引作成にも使われます。
+    """
+    if index is not None:
+        hits = index.search(title, author=author, year=year, limit=limit)
+        if hits:
+            return hits, "index"
+    key = json.dumps(["candidates", title, author, year, limit], ensure_ascii=False)
+    if cache is not None:
+        hit = cache.get(key)
+        if hit is not None:
+            return [BookCandidate(**c) for c in hit], "cache"
+    cands = search_openlibrary(title, author=author, year=year, limit=limit)
+    if cache is not None:
+        cache.set(key, [asdict(c) for c in cands], CANDIDATES_TTL)
+    return cands, "network"
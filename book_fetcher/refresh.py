@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+"""既存の結果ファイルの差分更新（--refresh）
+
+非エンジニア向けの要点:
+- 前回の results.json を読み込み、各本が「変わっていないか」だけを軽く確認します。
+- 確認には保存済みの作品/版キーを使い、条件付きリクエスト（ETag / Last-Modified）で
+  変更がなければ本文を受け取らずに済ませます。
+- 新しいタイトル・古くなった記録・部分的な記録（一時的な失敗で取れなかった情報がある）・
+  Open Library 側で変更があった本だけ、通常の取得をやり直します。
+"""
+
+import itertools
+import json
+from dataclasses import asdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .cache import JsonCache
+from .models import BookCandidate, BookInfo, bookinfo_from_dict
+from .openlibrary import OPENLIB_BASE
+from .prefixindex import candidate_from_info
+from .service import merge_openlibrary_details
+from .utils import http_get, open_text
+
+
+def iter_records(path: str) -> Iterator[BookInfo]:
+    """結果ファイル（JSON配列 または 1行1件のJSON Lines、.gz / .zst 可）から1件ずつ読み出す。
+
+    JSON Lines はファイル全体を読み込まず、展開しながら1行ずつ読みます。
+    """
+    with open_text(path, "r") as f:
+        first = next((line for line in f if line.strip()), "")
+        if not first:
+            return
+        if not first.lstrip().startswith("["):
+            try:
+                row = json.loads(first)
+            except ValueError:
+                row = None  # 複数行にまたがる1件のJSON
+            if row is not None:
+                rows: Iterable[Any] = itertools.chain([row], (json.loads(line) for line in f if line.strip()))
+                yield from (b for b in map(bookinfo_from_dict, rows) if b)
+                return
+        data = json.loads(first + f.read())
+    for r in data if isinstance(data, list) else [data]:
+        b = bookinfo_from_dict(r)
+        if b:
+            yield b
+
+
+def load_records(path: str) -> List[BookInfo]:
+    """結果ファイル（JSON配列 または 1行1件のJSON Lines、.gz / .zst 可）を読み込む。"""
+    return list(iter_records(path))
+
+
+def detect_format(path: str) -> str:
+    """結果ファイルの形式（"json" または "jsonl"）を、拡張子 → 中身の順で判定する。
+
+    上書き保存するときに、元と同じ形式で書き出すために使います。
+    """
+    name = path.lower()
+    for ext in (".gz", ".zst"):
+        if name.endswith(ext):
+            name = name[: -len(ext)]
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if name.endswith(".json"):
+        return "json"
+    with open_text(path, "r") as f:
+        first = next((line for line in f if line.strip()), "")
+    if not first or first.lstrip().startswith("["):
+        return "json"
+    try:
+        json.loads(first)
+    except ValueError:
+        return "json"  # 複数行にまたがる1件のJSON
+    return "jsonl"
+
+
+def _norm(s: str) -> str:
+    return " ".join(s.split()).casefold()
+
+
+class Refresher:
+    """前回の結果を元に、タイトルごとに「再利用 / 再取得」を決める。
+
+    引数:
+    - records: 前回の結果
+    - cache: ETag 等の記録先（次回の条件付きリクエストに使う）
+    - max_age_days: これより古い記録は確認せず再取得する（None なら無制限）
+    """
+
+    def __init__(self, records: List[BookInfo], cache: JsonCache, max_age_days: Optional[float] = None) -> None:
+        self.records = records
+        self.cache = cache
+        self.max_age = timedelta(days=max_age_days) if max_age_days else None
+        self._by_title: Dict[str, BookInfo] = {}
+        for r in records:
+            for k in (r.query, r.title):
+                if k:
+                    self._by_title.setdefault(_norm(k), r)
+        self._seen: Dict[int, bool] = {}
+        self.counts: Dict[str, int] = {"unchanged": 0, "updated": 0, "added": 0, "kept": 0, "removed": 0}
+
+    def titles(self) -> Iterator[str]:
+        """前回の入力タイトル（記録が無ければ本のタイトル）を順に返す。"""
+        seen = set()
+        for r in self.records:
+            t = r.query or r.title
+            if t and _norm(t) not in seen:
+                seen.add(_norm(t))
+                yield t
+
+    def is_stale(self, info: BookInfo) -> bool:
+        """確認だけでは済ませられない（再取得すべき）記録かどうか。"""
+        if not (info.openlibrary_work_key or info.openlibrary_edition_key):
+            return True
+        if info.pending_enrichment:
+            return True
+        if self.max_age:
+            if not info.fetched_at:
+                return True  # いつ取得したか分からない記録は古いものとして扱う
+            try:
+                fetched = datetime.strptime(info.fetched_at, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+            except ValueError:
+                return True
+            return datetime.now(timezone.utc) - fetched > self.max_age
+        return False
+
+    def revalidate(self, info: BookInfo) -> Tuple[bool, Dict[str, Dict[str, object]]]:
+        """Open Library の作品/版が前回から変わっていないかを確かめる。
+
+        - 前回の ETag / Last-Modified があれば条件付きリクエストを送り、304 なら変更なし
+        - 本文を受け取った場合は revision（版数）を前回の記録と比べる
+        - 記録が無い初回は、本文から説明文などを組み立てて保存済みの値と比べる
+
+        戻り値: (変更なしなら True, 新しい ETag 等)。ETag 等はまだ保存せず、
+        前回の記録を使い続けるか、取り直しが成功したときだけ save_validators で保存します
+        （取り直しに失敗したのに新しい ETag を覚えると、次回 304 で古い記録が「変更なし」になってしまうため）。
+        """
+        validators: Dict[str, Dict[str, object]] = {}
+        urls: List[Tuple[str, str]] = []
+        if info.openlibrary_work_key:
+            urls.append(("work", f"{OPENLIB_BASE}{info.openlibrary_work_key}.json"))
+        if info.openlibrary_edition_key:
+            urls.append(("edition", f"{OPENLIB_BASE}/books/{info.openlibrary_edition_key}.json"))
+        changed = False
+        docs: Dict[str, dict] = {}
+        for kind, url in urls:
+            key = f"validators:{url}"
+            prev = self.cache.get(key) or {}
+            headers: Dict[str, str] = {}
+            if prev.get("etag"):
+                headers["If-None-Match"] = prev["etag"]
+            if prev.get("last_modified"):
+                headers["If-Modified-Since"] = prev["last_modified"]
+            r = http_get(url, headers=headers or None)
+            if r.status_code == 304:
+                continue
+            doc = r.json()
+            validators[key] = {"etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified"), "revision": doc.get("revision")}
+            if prev.get("revision") is not None:
+                changed = changed or doc.get("revision") != prev["revision"]
+            else:
+                docs[kind] = doc
+        if docs:
+            if len(docs) != len(urls):
+                return False, validators
+            merged = merge_openlibrary_details(docs.get("work"), docs.get("edition"))
+            changed = changed or _differs(info, merged)
+        return not changed, validators
+
+    def save_validators(self, validators: Dict[str, Dict[str, object]]) -> None:
+        """revalidate で受け取った ETag 等を、次回の条件付きリクエストのために保存する。"""
+        for key, value in validators.items():
+            self.cache.set(key, value)
+
+    def lookup(self, title: str) -> Optional[BookInfo]:
+        return self._by_title.get(_norm(title))
+
+    def refresh(
+        self,
+        title: str,
+        fetch: Callable[..., Optional[BookInfo]],
+    ) -> Tuple[Optional[BookInfo], str, Optional[BookInfo]]:
+        """1タイトル分を更新する（作業スレッド上で実行）。
+
+        前回の記録に作品キーがあれば、タイトルで検索し直さずにその作品を取り直します
+        （fetch(title, candidate=...)。検索結果の順位が変わって別の本になるのを防ぐ）。
+
+        戻り値: (出力する BookInfo, 状態, 前回の記録)
+        状態: unchanged（変更なし）/ updated（更新）/ added（新規）/ kept（確認・取得に失敗したため前回のまま）
+              / missing（新規だが見つからなかった）
+        """
+        prior = self.lookup(title)
+        validators: Dict[str, Dict[str, object]] = {}
+        if prior and not self.is_stale(prior):
+            try:
+                unchanged, validators = self.revalidate(prior)
+            except Exception:
+                return prior, "kept", prior
+            if unchanged:
+                self.save_validators(validators)
+                return prior, "unchanged", prior
+        candidate = None
+        if prior and prior.openlibrary_work_key:
+            candidate = BookCandidate(index=0, **candidate_from_info(prior))
+        try:
+            info = fetch(title, candidate=candidate)
+        except Exception:
+            if prior:
+                return prior, "kept", prior
+            raise
+        if not info:
+            return (prior, "kept", prior) if prior else (None, "missing", None)
+        self.save_validators(validators)
+        if prior is None:
+            return info, "added", None
+        if _same_record(prior, info):
+            return info, "unchanged", prior
+        return info, "updated", prior
+
+    def record(self, status: str, prior: Optional[BookInfo]) -> None:
+        """結果を集計する（出力順に呼ぶ）。"""
+        if prior is not None:
+            self._seen[id(prior)] = True
+        self.counts[status] += 1
+
+    def removed(self) -> List[BookInfo]:
+        """今回の入力に含まれなかった前回の記録。"""
+        gone = [r for r in self.records if id(r) not in self._seen]
+        self.counts["removed"] = len(gone)
+        return gone
+
+
+def _differs(info: BookInfo, merged: Dict[str, object]) -> bool:
+    """Open Library から組み立てた値が、保存済みの値と食い違うか（空欄は比較しない）。
+
+    主題は Google のカテゴリが後ろに足されていることがあるため、先頭部分だけを比べます。
+    """
+    if merged["description"] and merged["description"] != info.description:
+        return True
+    subjects = merged["subjects"] or []
+    if subjects and list(info.subjects[: len(subjects)]) != list(subjects):
+        return True
+    if merged["publishers"] and merged["publishers"] != info.publishers:
+        return True
+    if merged["publish_date"] and merged["publish_date"] != info.publish_date:
+        return True
+    return False
+
+
+def _same_record(a: BookInfo, b: BookInfo) -> bool:
+    """取得日時以外がすべて同じか。"""
+    da, db = asdict(a), asdict(b)
+    da.pop("fetched_at", None)
+    db.pop("fetched_at", None)
+    return da == db
@@ -38,6 +38,8 @@ def render_text(info: BookInfo) -> str:
             lines.append(f"Amazon Product: {info.amazon_urls['product']}")
         if info.amazon_urls.get("search"):
             lines.append(f"Amazon Search:  {info.amazon_urls['search']}")
+    if info.pending_enrichment:
+        lines.append(f"Partially enriched (pending: {', '.join(info.pending_enrichment)})")
     if info.description:
         lines.append("")
         lines.append("Description:")
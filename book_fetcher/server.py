@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+"""ローカルHTTP APIサーバー（--serve）
+
+非エンジニア向けの要点:
+- 毎回コマンドを起動する代わりに、常駐して HTTP/JSON で問い合わせに答えます。
+- 通信の接続と取得結果をメモリに保持するので、2回目以降は速く返せます。
+- 同じ本への同時の問い合わせは1回の取得にまとめ、複数件はまとめて受け付けられます。
+
+エンドポイント:
+- GET  /health                         動作確認（まとめた回数・通信量など）
+- GET  /book?title=...&author=...      1冊分の BookInfo（JSON）
+- GET  /candidates?title=...&limit=N   候補一覧（--index 指定時は入力途中の文字列でも索引から即座に返す）
+- POST /book   {"title": ...} または [{"title": ...}, ...]  （複数件をまとめて取得。失敗した件は {"error": ...}）
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from .cache import JsonCache
+from .deadline import Deadline
+from .openlibrary import search_openlibrary
+from .service import fetch_book_info
+from .utils import TRANSFER
+
+if TYPE_CHECKING:
+    from .completeness import EnrichmentPolicy
+    from .hedge import Hedger
+    from .prefixindex import PrefixIndex
+
+
+DEFAULT_RESULT_TTL = 24 * 3600  # 取得結果をメモリに覚えておく秒数
+PURGE_INTERVAL = 600  # 期限切れの結果をまとめて捨てる間隔（秒）。常駐中にキャッシュが増え続けないように
+
+
+class RequestCoalescer:
+    """同時に来た同じ問い合わせを1回の取得にまとめ、共通の作業スレッドで実行する。
+
+    引数:
+    - workers: 同時に上流へ問い合わせる最大数
+    """
+
+    def __init__(self, workers: int = 8) -> None:
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers))
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def submit(self, key: Hashable, func: Callable[..., Any], **kwargs: Any) -> Future:
+        """func(**kwargs) の実行を受け付ける。同じ key が処理中なら、その結果を共有する。"""
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.coalesced += 1
+                return fut
+            fut = self._pool.submit(func, **kwargs)
+            self._inflight[key] = fut
+        fut.add_done_callback(lambda _f: self._forget(key))
+        return fut
+
+    def _forget(self, key: Hashable) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False)
+
+
+class BookService:
+    """サーバーが使う取得処理（結果キャッシュ＋問い合わせのまとめ）。"""
+
+    def __init__(
+        self,
+        use_google: bool = False,
+        google_api_key: Optional[str] = None,
+        amazon_domain: str = "co.jp",
+        cache: Optional[JsonCache] = None,
+        result_ttl: float = DEFAULT_RESULT_TTL,
+        workers: int = 8,
+        hedger: Optional[Hedger] = None,
+        index: Optional[PrefixIndex] = None,
+        google_policy: Optional[EnrichmentPolicy] = None,
+        deadline: Optional[float] = None,
+    ) -> None:
+        self.use_google = use_google
+        self.google_api_key = google_api_key
+        self.amazon_domain = amazon_domain
+        self.cache = cache if cache is not None else JsonCache()
+        self.result_ttl = result_ttl
+        self.coalescer = RequestCoalescer(workers=workers)
+        self.hedger = hedger
+        self.index = index
+        self.google_policy = google_policy
+        self.deadline = deadline
+        self._last_purge = time.monotonic()
+        self._purge_lock = threading.Lock()
+
+    def _remember(self, key: str, value: Any) -> None:
+        """結果をキャッシュに入れる。一定間隔ごとに期限切れの結果もまとめて捨てる。"""
+        self.cache.set(key, value, self.result_ttl)
+        now = time.monotonic()
+        with self._purge_lock:
+            if now - self._last_purge < PURGE_INTERVAL:
+                return
+            self._last_purge = now
+        self.cache.purge()
+
+    def _fetch(self, cache_key: str, title: str, author: Optional[str], year: Optional[int], pick_index: int) -> Optional[Dict[str, Any]]:
+        """1冊分を取得してキャッシュに入れる（まとめた問い合わせでも1回だけ、作業スレッド上で実行）。"""
+        info = fetch_book_info(
+            title,
+            author=author,
+            year=year,
+            pick_index=pick_index,
+            use_google=self.use_google,
+            google_api_key=self.google_api_key,
+            amazon_domain=self.amazon_domain,
+            hedger=self.hedger,
+            google_policy=self.google_policy,
+            deadline=Deadline(self.deadline),
+        )
+        result = asdict(info) if info else None
+        self._remember(cache_key, result or {})
+        return result
+
+    def submit_book(self, title: str, author: Optional[str] = None, year: Optional[int] = None, pick_index: int = 0) -> Future:
+        """1冊分の取得を受け付け、結果（見つからなければ None）の Future を返す。"""
+        key = json.dumps(["book", title, author, year, pick_index], ensure_ascii=False)
+        hit = self.cache.get(key)
+        if hit is not None:
+            done: Future = Future()
+            done.set_result(hit or None)
+            return done
+        return self.coalescer.submit(key, self._fetch, cache_key=key, title=title, author=author, year=year, pick_index=pick_index)
+
+    def book(self, query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """1冊分を取得する（見つからなければ None、失敗すれば例外）。"""
+        return self.submit_book(**_book_args(query)).result()
+
+    def books(self, queries: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """複数件をまとめて受け付け、全件を並行して取得する（結果は入力順）。
+
+        失敗した件は {"error": 理由} になり、ほかの件の結果はそのまま返します。
+        """
+        futures = [self.submit_book(**_book_args(q)) for q in queries]
+        out: List[Optional[Dict[str, Any]]] = []
+        for fut in futures:
+            try:
+                out.append(fut.result())
+            except Exception as e:
+                out.append({"error": str(e)})
+        return out
+
+    def shutdown(self) -> None:
+        """作業スレッド（問い合わせのまとめ・保険のリクエスト）を止める。"""
+        self.coalescer.shutdown()
+        if self.hedger:
+            self.hedger.shutdown()
+
+    def candidates(self, title: str, author: Optional[str] = None, year: Optional[int] = None, limit: int = 5) -> List[Dict[str, Any]]:
+        """候補一覧を返す（前方一致インデックス → キャッシュ → Open Library の順）。"""
+        if self.index is not None:
+            hits = self.index.search(title, author=author, year=year, limit=limit)
+            if hits:
+                return [asdict(c) for c in hits]
+        key = json.dumps(["candidates", title, author, year, limit], ensure_ascii=False)
+        hit = self.cache.get(key)
+        if hit is not None:
+            return hit
+        return self.coalescer.submit(key, self._search, cache_key=key, title=title, author=author, year=year, limit=limit).result()
+
+    def _search(self, cache_key: str, title: str, author: Optional[str], year: Optional[int], limit: int) -> List[Dict[str, Any]]:
+        """候補を検索してキャッシュに入れる（まとめた問い合わせでも1回だけ）。"""
+        cands = [asdict(c) for c in search_openlibrary(title=title, author=author, year=year, limit=limit)]
+        self._remember(cache_key, cands)
+        return cands
+
+
+def _book_args(q: Dict[str, Any]) -> Dict[str, Any]:
+    """問い合わせ（クエリ文字列や JSON）を submit_book の引数にする。"""
+    return {
+        "title": str(q.get("title") or ""),
+        "author": q.get("author") or None,
+        "year": _int_or_none(q.get("year")),
+        "pick_index": _int_or_none(q.get("pick_index")) or 0,
+    }
+
+
+def _int_or_none(v: Any) -> Optional[int]:
+    try:
+        return int(v) if v not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _make_handler(service: BookService) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-Alive で接続を使い回せるように
+
+        def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+            pass
+
+        def _send(self, status: int, payload: Any) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:  # noqa: N802
+            url = urlparse(self.path)
+            q = {k: v[0] for k, v in parse_qs(url.query).items()}
+            try:
+                if url.path == "/health":
+                    health = {
+                        "status": "ok",
+                        "coalesced": service.coalescer.coalesced,
+                        "wire_bytes": TRANSFER.wire_bytes,
+                        "content_bytes": TRANSFER.content_bytes,
+                    }
+                    if service.google_policy:
+                        health["google_skipped"] = service.google_policy.stats["skipped"]
+                    self._send(200, health)
+                elif url.path == "/book":
+                    if not q.get("title"):
+                        self._send(400, {"error": "title is required"})
+                        return
+                    result = service.book(q)
+                    self._send(200 if result else 404, result or {"error": "No book found"})
+                elif url.path == "/candidates":
+                    if not q.get("title"):
+                        self._send(400, {"error": "title is required"})
+                        return
+                    limit = _int_or_none(q.get("limit")) or 5
+                    self._send(200, service.candidates(q["title"], q.get("author"), _int_or_none(q.get("year")), limit))
+                else:
+                    self._send(404, {"error": "Not found"})
+            except Exception as e:
+                self._send(502, {"error": str(e)})
+
+        def do_POST(self) -> None:  # noqa: N802
+            url = urlparse(self.path)
+            if url.path != "/book":
+                self._send(404, {"error": "Not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"null")
+            except ValueError:
+                self._send(400, {"error": "Invalid JSON body"})
+                return
+            queries = payload if isinstance(payload, list) else [payload]
+            if not queries or not all(isinstance(x, dict) and x.get("title") for x in queries):
+                self._send(400, {"error": "Each query needs a title"})
+                return
+            if isinstance(payload, list):
+                self._send(200, service.books(queries))
+                return
+            try:
+                result = service.book(payload)
+            except Exception as e:
+                self._send(502, {"error": str(e)})
+                return
+            self._send(200 if result else 404, result or {"error": "No book found"})
+
+    return Handler
+
+
+def serve(service: BookService, host: str = "127.0.0.1", port: int = 8765) -> None:
+    """サーバーを起動し、Ctrl+C で止まるまで問い合わせに答える。"""
+    httpd = ThreadingHTTPServer((host, port), _make_handler(service))
+    httpd.daemon_threads = True
+    print(f"Serving on http://{host}:{httpd.server_address[1]} (Ctrl+C to stop)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.shutdown()
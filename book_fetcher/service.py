@@ -4,18 +4,15 @@ from __future__ import annotations
 
 各API（Open Library / Google Books）から必要情報を集め、
 最終的に1冊の BookInfo にまとめる中核ロジックです。
+Google Books のモジュールは、--use-google の時だけ読み込みます。
 """
 
-from typing import Any, Dict, List, Optional
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
 
 from .amazon import build_amazon_urls
-from .googlebooks import (
-    augment_with_google,
-    build_bookinfo_from_google,
-    search_googlebooks,
-    select_google_item,
-)
-from .models import BookInfo
+from .deadline import Deadline, DeadlineExceeded
+from .models import BookCandidate, BookInfo
 from .openlibrary import (
     OPENLIB_BASE,
     build_cover_urls,
@@ -24,7 +21,11 @@ from .openlibrary import (
     fetch_work_details,
     search_openlibrary,
 )
-from .utils import normalize_desc
+from .utils import is_transient_error, normalize_desc, parse_year_from_date, slugify_filename
+
+if TYPE_CHECKING:
+    from .completeness import EnrichmentPolicy
+    from .hedge import Hedger
 
 
 def fetch_book_info(
@@ -35,6 +36,10 @@ def fetch_book_info(
     use_google: bool = False,
     google_api_key: Optional[str] = None,
     amazon_domain: str = "co.jp",
+    hedger: Optional[Hedger] = None,
+    google_policy: Optional[EnrichmentPolicy] = None,
+    deadline: Optional[Deadline] = None,
+    candidate: Optional[BookCandidate] = None,
 ) -> Optional[BookInfo]:
     """タイトル（＋任意で著者・年）から1冊分の BookInfo を作る。
 
@@ -43,48 +48,91 @@ def fetch_book_info(
     2) 作品/版の詳細で不足情報を補う
     3) （指定時）Googleでさらに空欄を補完
     4) Amazon のリンクを作成
+
+    hedger を渡すと、遅い問い合わせに保険のリクエストを重ね、
+    Google 併用時は Open Library の検索が遅ければ Google 検索を先回りして始めます。
+    google_policy を渡すと、必要な項目がそろっている本では Google 補完の問い合わせを省きます。
+    deadline を渡すと、各段階に残り時間をタイムアウトとして渡し、時間切れの段階は飛ばして
+    部分的な結果（pending_enrichment に飛ばした段階を記録）を返します。検索の段階で時間切れなら DeadlineExceeded。
+    candidate を渡すと（クロールで作品が分かっている場合）、検索を省いてその作品の詳細から作ります。
+    Open Library で見つからず、Google の検索が一時的な失敗（時間切れ・接続エラー・429/5xx など）だった場合も
+    「見つからない」とはせず、その例外を送出します（見つからない記録として長く覚えないため）。
     """
-    candidates = search_openlibrary(title=title, author=author, year=year, limit=max(5, pick_index + 1))
-    cand = choose_candidate(candidates, pick_index)
+    dl = deadline or Deadline()
+    limit = max(5, pick_index + 1)
+    speculated = False
+    google_data: Optional[Dict[str, Any]] = None
+    google_errors: List[Exception] = []
+    if candidate is not None:
+        candidates = [candidate]  # 一覧で作品が分かっているので検索しない
+    elif hedger and use_google:
+        from .googlebooks import search_googlebooks
+
+        def google_or_none() -> Optional[Dict[str, Any]]:
+            try:
+                return search_googlebooks(title=title, author=author, api_key=google_api_key, timeout=dl.timeout(15))
+            except Exception as e:
+                google_errors.append(e)
+                return None
+
+        source, res = hedger.race(
+            "openlibrary.search",
+            lambda: search_openlibrary(title=title, author=author, year=year, limit=limit, timeout=dl.timeout(15)),
+            google_or_none,
+            accept=lambda cands: choose_candidate(cands, pick_index) is not None,
+        )
+        speculated = source == "fallback"
+        candidates = [] if speculated else res
+        google_data = res if speculated else None
+    else:
+        candidates = _call(
+            hedger, "openlibrary.search", search_openlibrary, title=title, author=author, year=year, limit=limit, make_timeout=lambda: dl.timeout(15)
+        )
+    cand = candidate or choose_candidate(candidates, pick_index)
     if not cand:
         if use_google:
+            from .googlebooks import build_bookinfo_from_google, search_googlebooks, select_google_item
+
             try:
-                gb = search_googlebooks(title=title, author=author, api_key=google_api_key)
+                if speculated and google_errors:
+                    raise google_errors[0]
+                gb = google_data if speculated else search_googlebooks(title=title, author=author, api_key=google_api_key, timeout=dl.timeout(15))
                 item = select_google_item(gb)
                 binfo = build_bookinfo_from_google(item)
                 if binfo:
                     binfo.amazon_urls = build_amazon_urls(binfo.title, binfo.authors, binfo.isbns, amazon_domain)
+                    _stamp(binfo, title)
                 return binfo
-            except Exception:
+            except Exception as e:
+                if is_transient_error(e):
+                    raise
                 return None
         return None
 
-    description: Optional[str] = None
-    subjects: List[str] = []
-    publishers: List[str] = []
-    publish_date: Optional[str] = None
-
+    pending: List[str] = []
+    work: Optional[Dict[str, Any]] = None
     if cand.work_key:
         try:
-            work = fetch_work_details(cand.work_key)
-            description = normalize_desc(work.get("description")) or description
-            subjects = work.get("subjects", []) or subjects
-        except Exception:
-            pass
+            work = _call(hedger, "openlibrary.work", fetch_work_details, cand.work_key, make_timeout=lambda: dl.timeout(15))
+        except Exception as e:
+            if is_transient_error(e):
+                pending.append("work")
 
+    edition: Optional[Dict[str, Any]] = None
     edition_key: Optional[str] = cand.edition_keys[0] if cand.edition_keys else None
     if edition_key:
         try:
-            ed = fetch_edition_details(edition_key)
-            description = normalize_desc(ed.get("description")) or normalize_desc(ed.get("notes")) or description
-            pubs = ed.get("publishers") or []
-            if isinstance(pubs, list):
-                publishers = [p["name"] if isinstance(p, dict) and "name" in p else str(p) for p in pubs]
-            publish_date = ed.get("publish_date") or publish_date
-        except Exception:
-            pass
-
-    cover_urls = build_cover_urls(cand.cover_id, cand.isbns)
+            edition = _call(hedger, "openlibrary.edition", fetch_edition_details, edition_key, make_timeout=lambda: dl.timeout(15))
+        except Exception as e:
+            if is_transient_error(e):
+                pending.append("edition")
+
+    details = merge_openlibrary_details(work, edition)
+    # 一覧から作った候補には無い項目（ISBN・カバー・初出年）は、作品/版の詳細から補う
+    isbns = cand.isbns or [*((edition or {}).get("isbn_13") or []), *((edition or {}).get("isbn_10") or [])]
+    covers = [c for c in (edition or {}).get("covers") or (work or {}).get("covers") or [] if isinstance(c, int) and c > 0]
+    cover_urls = build_cover_urls(cand.cover_id or (covers[0] if covers else None), isbns)
+    first_publish_year = cand.first_publish_year or parse_year_from_date((work or {}).get("first_publish_date"))
     openlibrary_url = None
     if cand.work_key:
         openlibrary_url = f"{OPENLIB_BASE}{cand.work_key}"
@@ -94,38 +142,99 @@ def fetch_book_info(
     result = BookInfo(
         title=cand.title,
         authors=cand.author_names,
-        first_publish_year=cand.first_publish_year,
-        publishers=publishers,
-        publish_date=publish_date,
-        isbns=cand.isbns,
+        first_publish_year=first_publish_year,
+        publishers=details["publishers"],
+        publish_date=details["publish_date"],
+        isbns=isbns,
         openlibrary_work_key=cand.work_key,
         openlibrary_edition_key=edition_key,
         openlibrary_url=openlibrary_url,
-        description=description,
-        subjects=subjects,
+        description=details["description"],
+        subjects=details["subjects"],
         cover_urls=cover_urls,
+        pending_enrichment=pending,
     )
 
-    if use_google:
-        result = augment_with_google(
-            result,
-            title=cand.title or title,
-            authors_query=cand.author_names,
-            isbns_query=cand.isbns,
-            api_key=google_api_key,
-        )
+    if use_google and (google_policy is None or google_policy.should_augment(result)):
+        from .googlebooks import augment_with_google
+
+        try:
+            timeout = dl.timeout(15)
+        except DeadlineExceeded:
+            result.pending_enrichment.append("google")  # 時間切れでも、ここまでの結果は返す
+        else:
+            result = augment_with_google(
+                result,
+                title=cand.title or title,
+                authors_query=cand.author_names,
+                isbns_query=isbns,
+                api_key=google_api_key,
+                timeout=timeout,
+            )
 
     result.amazon_urls = build_amazon_urls(result.title, result.authors, result.isbns, amazon_domain)
+    _stamp(result, title)
     return result
 
 
+def _call(
+    hedger: Optional[Hedger],
+    name: str,
+    fn: Callable[..., Any],
+    *args: Any,
+    make_timeout: Callable[[], float],
+    **kwargs: Any,
+) -> Any:
+    """hedger があれば保険つきで、なければそのまま fn を呼ぶ。
+
+    タイムアウトはリクエストを送る時点で make_timeout から決める（保険のリクエストも、その時点の残り時間）。
+    """
+    if hedger:
+        return hedger.call(name, fn, *args, make_timeout=make_timeout, **kwargs)
+    return fn(*args, timeout=make_timeout(), **kwargs)
+
+
+def merge_openlibrary_details(
+    work: Optional[Dict[str, Any]],
+    edition: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """作品（work）と版（edition）の詳細JSONから、説明文・主題・出版社・出版日をまとめる。
+
+    版の説明文（なければ notes）があれば作品の説明文より優先します。
+    戻り値: {"description", "subjects", "publishers", "publish_date"}
+    """
+    description: Optional[str] = None
+    subjects: List[str] = []
+    publishers: List[str] = []
+    publish_date: Optional[str] = None
+    if work:
+        description = normalize_desc(work.get("description")) or description
+        subjects = work.get("subjects", []) or subjects
+    if edition:
+        description = normalize_desc(edition.get("description")) or normalize_desc(edition.get("notes")) or description
+        pubs = edition.get("publishers") or []
+        if isinstance(pubs, list):
+            publishers = [p["name"] if isinstance(p, dict) and "name" in p else str(p) for p in pubs]
+        publish_date = edition.get("publish_date") or publish_date
+    return {
+        "description": description,
+        "subjects": subjects,
+        "publishers": publishers,
+        "publish_date": publish_date,
+    }
+
+
+def _stamp(info: BookInfo, query: str) -> None:
+    """検索に使ったタイトルと取得日時（UTC）を記録する（--refresh で使う）。"""
+    info.query = query
+    info.fetched_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
 def build_cover_filename(info: BookInfo, size: str) -> str:
     """カバー画像の保存に使う、重複しにくいファイル名を作る。
 
     例: タイトル_版キー（または作品キー/ISBN）_l.jpg
     """
-    from .utils import slugify_filename
-
     base = slugify_filename(info.title)
     suffix = None
     if info.openlibrary_edition_key:
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+"""通信量の計測
+
+非エンジニア向けの要点:
+- 圧縮して送ってよいこと（Accept-Encoding）は requests が既定で伝えます
+  （gzip / deflate と、brotli・zstandard が入っていれば br / zstd）。こちらでは変更しません。
+- 実際に通信した量（圧縮されたままの量）と、展開後の量を数え、実行後に表示します。
+- 大きな JSON が圧縮されずに届いた回数も数えます（相手側の設定の確認用）。
+"""
+
+import threading
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+
+UNCOMPRESSED_JSON_BYTES = 1024  # これより大きい JSON が無圧縮で届いたら数える
+
+
+def format_bytes(n: float) -> str:
+    """バイト数を読みやすい単位にする（例: 1.5 MB）。"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+class TransferStats:
+    """応答ごとの通信量（圧縮されたまま / 展開後）を数える。複数スレッドから使える。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.wire_bytes = 0  # 実際に受け取った量（圧縮されたまま）
+        self.content_bytes = 0  # 展開後の量
+        self.encodings: Dict[str, int] = {}  # 圧縮方式ごとの応答数
+        self.uncompressed_json = 0
+
+    def record(self, response: requests.Response, content_bytes: Optional[int] = None) -> None:
+        """読み終えた応答を数える。
+
+        - content_bytes: 展開後の量（stream=True で少しずつ読んだ場合に渡す。省略時は response.content の長さ）
+        """
+        if content_bytes is None:
+            content_bytes = len(response.content or b"")
+        tell = getattr(getattr(response, "raw", None), "tell", None)
+        try:
+            wire = int(tell()) if tell else 0
+        except Exception:
+            wire = 0
+        wire = wire or content_bytes
+        encoding = (response.headers.get("Content-Encoding") or "").strip().lower()
+        is_json = "json" in (response.headers.get("Content-Type") or "")
+        with self._lock:
+            self.responses += 1
+            self.wire_bytes += wire
+            self.content_bytes += content_bytes
+            if encoding and encoding != "identity":
+                self.encodings[encoding] = self.encodings.get(encoding, 0) + 1
+            elif is_json and content_bytes >= UNCOMPRESSED_JSON_BYTES:
+                self.uncompressed_json += 1
+
+    def summary(self) -> str:
+        """実行後に表示する1行の要約。"""
+        ratio = self.wire_bytes / self.content_bytes if self.content_bytes else 1.0
+        parts = [
+            f"{self.responses} response(s), {format_bytes(self.wire_bytes)} on the wire "
+            f"for {format_bytes(self.content_bytes)} of content ({ratio:.0%})"
+        ]
+        if self.encodings:
+            parts.append("compressed: " + ", ".join(f"{k} {v}" for k, v in sorted(self.encodings.items())))
+        if self.uncompressed_json:
+            parts.append(f"{self.uncompressed_json} large JSON response(s) arrived uncompressed")
+        return "; ".join(parts)
@@ -4,26 +4,130 @@ from __future__ import annotations
 
 非エンジニア向けの要約:
 - http_get: URLにアクセスして結果を返す基本関数
+- http_request: 接続先ごとのサーキットブレーカーを通して通信する土台
+- is_transient_error: 「時間をおけば成功しそうな」失敗かを判定する
+- get_session: 接続を使い回すためのセッション（スレッドごと）
 - normalize_desc: 概要テキストを整える（空文字や辞書形式に対応）
 - parse_year_from_date: 日付文字列から「年」だけ取り出す
 - slugify_filename: ファイル名に使える安全な文字へ変換する
+- open_text: テキストファイルを開く（.gz / .zst なら自動で圧縮/展開）
+- set_default_mode: 一時ファイルを、普通に作ったファイルと同じ権限にする
+- TRANSFER: 通信量（圧縮されたまま / 展開後）の集計
+
+起動を速くするため、requests は最初の通信時に読み込みます。
 """
 
-from typing import Any, Dict, Optional
+import os
+import re
+import threading
+from typing import IO, TYPE_CHECKING, Any, Dict, Optional
+from urllib.parse import urlsplit
+
+from .breaker import CircuitBreaker, CircuitOpenError
+from .deadline import DeadlineExceeded, ShortenedTimeout
+from .transfer import TransferStats
+
+if TYPE_CHECKING:
+    import requests
+
+
+_local = threading.local()
+BREAKER = CircuitBreaker()  # 全通信で共有する、接続先ごとのサーキットブレーカー
+TRANSFER = TransferStats()  # 全通信で共有する、通信量の集計
+_UNSAFE_FILENAME_CHARS = re.compile(r"[\\/:*?\"<>|]+")
+_WHITESPACE = re.compile(r"\s+")
+_UMASK: Optional[int] = None  # 最初の保存時に一度だけ読む（_umask）
+_UMASK_LOCK = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """スレッドごとの requests.Session を返す。
+
+    同じ接続（Keep-Alive）を使い回すので、2回目以降のアクセスが速くなります。
+    """
+    session = getattr(_local, "session", None)
+    if session is None:
+        import requests
+
+        session = requests.Session()
+        _local.session = session
+    return session
+
+
+def configure_breaker(failure_threshold: int, reset_timeout: float) -> None:
+    """サーキットブレーカーの設定を変える（failure_threshold=0 で無効）。"""
+    BREAKER.failure_threshold = failure_threshold
+    BREAKER.reset_timeout = reset_timeout
+
+
+def http_request(method: str, url: str, **kwargs: Any) -> requests.Response:
+    """サーキットブレーカーを通して HTTP リクエストを送る（全通信の土台）。
+
+    - 接続先が停止中なら、通信せずに CircuitOpenError を送出する
+    - 接続できない・時間切れ・429・5xx を「失敗」として数える
+      （持ち時間に合わせて短くしたタイムアウト（ShortenedTimeout）での時間切れは数えない）
+    - ステータスによる例外（raise_for_status）は呼び出し側に任せる
+    - 通信量を TRANSFER に数える（stream=True の場合は読み終えた側で数える）
+    """
+    import requests
+
+    host = urlsplit(url).netloc
+    BREAKER.before(host)
+    try:
+        r = get_session().request(method, url, **kwargs)
+    except requests.Timeout:
+        if isinstance(kwargs.get("timeout"), ShortenedTimeout):
+            BREAKER.release(host)
+        else:
+            BREAKER.failure(host)
+        raise
+    except requests.RequestException:
+        BREAKER.failure(host)
+        raise
+    except BaseException:
+        BREAKER.release(host)
+        raise
+    if r.status_code == 429 or r.status_code >= 500:
+        BREAKER.failure(host)
+    else:
+        BREAKER.success(host)
+    if not kwargs.get("stream"):
+        TRANSFER.record(r)
+    return r
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """一時的な失敗（停止中・持ち時間切れ・接続できない・時間切れ・429・5xx）なら True。
+
+    404 など「何度やっても同じ」失敗は False です。
+    """
+    if isinstance(exc, (CircuitOpenError, DeadlineExceeded)):
+        return True
+    import requests
 
-import requests
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return False
 
 
-def http_get(url: str, params: Optional[dict] = None, timeout: int = 15) -> requests.Response:
+def http_get(
+    url: str,
+    params: Optional[dict] = None,
+    timeout: int = 15,
+    headers: Optional[Dict[str, str]] = None,
+) -> requests.Response:
     """HTTPでGETアクセスを行う基本関数。
 
     引数:
     - url: アクセス先URL
     - params: クエリパラメータ（?key=value の部分）
     - timeout: 待ち時間（秒）
-    戻り値: requests.Response（成功時のレスポンス）
+    - headers: 追加のリクエストヘッダ（例: 条件付きリクエストの If-None-Match）
+    戻り値: requests.Response（成功時のレスポンス。304 Not Modified もそのまま返す）
     """
-    r = requests.get(url, params=params, timeout=timeout)
+    r = http_request("GET", url, params=params, timeout=timeout, headers=headers)
     r.raise_for_status()
     return r
 
@@ -61,9 +165,71 @@ def parse_year_from_date(date_str: Optional[str]) -> Optional[int]:
 
 def slugify_filename(s: str, maxlen: int = 64) -> str:
     """ファイル名に安全に使えるように、危険文字を取り除き置換する。"""
-    import re
-
     s = (s or "book").strip()
-    s = re.sub(r"[\\/:*?\"<>|]+", "", s)
-    s = re.sub(r"\s+", "_", s)
+    s = _UNSAFE_FILENAME_CHARS.sub("", s)
+    s = _WHITESPACE.sub("_", s)
     return (s or "book")[:maxlen]
+
+
+def require_codec(path: str) -> None:
+    """圧縮ファイルを扱うのに必要なライブラリがあるか確かめる（無ければ RuntimeError）。"""
+    if path.endswith(".zst"):
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            raise RuntimeError(f"{path}: .zst files require zstandard (pip install zstandard)") from None
+
+
+def _umask() -> int:
+    """プロセスの umask を返す（変更はしない）。
+
+    Linux では /proc/self/status の Umask: 行から読みます。読めない環境では、
+    最初の1回だけロックの中で umask を一瞬 0 にして読み、すぐ元に戻します。
+    """
+    global _UMASK
+    with _UMASK_LOCK:
+        if _UMASK is None:
+            try:
+                with open("/proc/self/status", encoding="ascii") as f:
+                    for line in f:
+                        if line.startswith("Umask:"):
+                            _UMASK = int(line.split()[1], 8)
+                            break
+            except (OSError, ValueError, IndexError):
+                pass
+            if _UMASK is None:
+                _UMASK = os.umask(0)
+                os.umask(_UMASK)
+        return _UMASK
+
+
+def set_default_mode(path: str) -> None:
+    """一時ファイル（mkstemp で作ると本人しか読めない 0600 になる）を、普通に作ったファイルと同じ権限にする。
+
+    置き換え前に呼ぶことで、保存したファイルを他のユーザーやWebサーバーからも従来どおり読めるようにします。
+    """
+    os.chmod(path, 0o666 & ~_umask())
+
+
+def open_text(path: str, mode: str = "r") -> IO[str]:
+    """UTF-8 のテキストファイルを開く。
+
+    拡張子が .gz なら gzip、.zst なら zstd（zstandard が必要）として、少しずつ圧縮/展開しながら読み書きする。
+    """
+    if path.endswith(".gz"):
+        import gzip
+
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if path.endswith(".zst"):
+        require_codec(path)
+        import io
+
+        import zstandard
+
+        raw = open(path, mode + "b")
+        if "r" in mode:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        else:
+            stream = zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
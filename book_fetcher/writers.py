@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+"""結果の書き出し（1件ずつ逐次出力）
+
+非エンジニア向けの要点:
+- 全件が揃うのを待たず、1冊分ができるたびに書き出します。
+- ファイルに保存する場合は一時ファイルに書き、最後に置き換えます
+  （途中で失敗しても以前の結果ファイルは壊れません）。
+- 形式: text / json（配列）/ jsonl（1行1件）/ sqlite（表に分けたデータベース）/ parquet（列形式）
+"""
+
+import json
+import os
+import sys
+import tempfile
+from abc import ABC, abstractmethod
+from dataclasses import asdict
+from typing import IO, Any, Dict, List, Optional
+
+from .models import BookInfo
+from .render import render_text
+from .utils import open_text, set_default_mode
+
+
+FILE_ONLY_FORMATS = ("sqlite", "parquet")  # 標準出力には書けない形式
+
+
+class ResultWriter(ABC):
+    """結果を1件ずつ書き出す共通の入れ物。
+
+    引数:
+    - path: 保存先ファイル。None なら標準出力に書く
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = os.path.abspath(path) if path else None
+        self.count = 0
+        self._tmp: Optional[str] = None
+        if self.path:
+            d = os.path.dirname(self.path) or "."
+            os.makedirs(d, exist_ok=True)
+            fd, self._tmp = tempfile.mkstemp(dir=d, prefix=".tmp-", suffix="-" + os.path.basename(self.path))
+            os.close(fd)
+        try:
+            self._open(self._tmp)
+        except BaseException:
+            self._remove_tmp()
+            raise
+
+    def write(self, info: BookInfo) -> None:
+        """1冊分を書き出す。"""
+        self._write_record(info)
+        self.count += 1
+
+    def close(self) -> None:
+        """書き出しを完了する（ファイルなら一時ファイルを本来の名前に置き換える）。
+
+        仕上げに失敗した場合（ディスクが一杯、SQLite のエラーなど）は一時ファイルを消し、
+        RuntimeError を送出します（元のファイルはそのまま残ります）。
+        """
+        try:
+            self._finish()
+            self._close_target()
+            if self.path and self._tmp:
+                set_default_mode(self._tmp)
+                os.replace(self._tmp, self.path)
+                self._tmp = None
+        except Exception as e:
+            try:
+                self.abort()
+            except Exception:
+                self._remove_tmp()
+            raise RuntimeError(f"failed to finish {self.path or 'output'}: {e}") from e
+
+    def abort(self) -> None:
+        """書き出しを取りやめ、一時ファイルを消す。"""
+        try:
+            self._close_target()
+        finally:
+            self._remove_tmp()
+
+    def _remove_tmp(self) -> None:
+        if self._tmp and os.path.exists(self._tmp):
+            os.remove(self._tmp)
+        self._tmp = None
+
+    @abstractmethod
+    def _open(self, tmp_path: Optional[str]) -> None:
+        """書き出し先を開く（tmp_path が None なら標準出力）。"""
+
+    @abstractmethod
+    def _write_record(self, info: BookInfo) -> None:
+        """1冊分を書き出し先に書く。"""
+
+    def _finish(self) -> None:
+        pass
+
+    def _close_target(self) -> None:
+        pass
+
+
+class _TextStreamWriter(ResultWriter):
+    """テキストとして書き出す形式の共通部分（標準出力なら1件ごとに flush）。"""
+
+    _stream: IO[str]
+
+    def _open(self, tmp_path: Optional[str]) -> None:
+        self._stream = open_text(tmp_path, "w") if tmp_path else sys.stdout
+
+    def write(self, info: BookInfo) -> None:
+        super().write(info)
+        if not self.path:
+            self._stream.flush()
+
+    def _close_target(self) -> None:
+        if self.path:
+            if not self._stream.closed:
+                self._stream.close()
+        else:
+            self._stream.flush()
+
+
+class TextWriter(_TextStreamWriter):
+    """読みやすいテキスト形式（1冊ごとに区切り線）で書き出す。"""
+
+    def _write_record(self, info: BookInfo) -> None:
+        self._stream.write(render_text(info) + "\n" + ("-" * 40) + "\n")
+
+
+class JsonArrayWriter(_TextStreamWriter):
+    """JSON配列として書き出す（json.dump(indent=2) と同じ見た目を逐次で作る）。"""
+
+    def _write_record(self, info: BookInfo) -> None:
+        body = json.dumps(asdict(info), ensure_ascii=False, indent=2)
+        body = "\n".join("  " + line for line in body.splitlines())
+        self._stream.write(("[\n" if self.count == 0 else ",\n") + body)
+
+    def _finish(self) -> None:
+        self._stream.write("\n]" if self.count else "[]")
+        if not self.path:
+            self._stream.write("\n")
+
+
+class JsonLinesWriter(_TextStreamWriter):
+    """1行に1件のJSON（JSON Lines）で書き出す。大量データを1件ずつ読み込む用途向け。"""
+
+    def _write_record(self, info: BookInfo) -> None:
+        self._stream.write(json.dumps(asdict(info), ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def _flat_row(info: BookInfo) -> Dict[str, Any]:
+    """表形式で扱いやすいよう、辞書型の項目（cover_urls 等）を列に展開する。"""
+    return {
+        "title": info.title,
+        "authors": list(info.authors),
+        "first_publish_year": info.first_publish_year,
+        "publishers": list(info.publishers),
+        "publish_date": info.publish_date,
+        "isbns": list(info.isbns),
+        "openlibrary_work_key": info.openlibrary_work_key,
+        "openlibrary_edition_key": info.openlibrary_edition_key,
+        "openlibrary_url": info.openlibrary_url,
+        "description": info.description,
+        "subjects": list(info.subjects),
+        "cover_url_s": info.cover_urls.get("s"),
+        "cover_url_m": info.cover_urls.get("m"),
+        "cover_url_l": info.cover_urls.get("l"),
+        "amazon_product_url": info.amazon_urls.get("product"),
+        "amazon_search_url": info.amazon_urls.get("search"),
+        "query": info.query,
+        "fetched_at": info.fetched_at,
+        "pending_enrichment": list(info.pending_enrichment),
+    }
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE books (
+    id INTEGER PRIMARY KEY,
+    title TEXT,
+    first_publish_year INTEGER,
+    publish_date TEXT,
+    openlibrary_work_key TEXT,
+    openlibrary_edition_key TEXT,
+    openlibrary_url TEXT,
+    description TEXT,
+    cover_url_s TEXT,
+    cover_url_m TEXT,
+    cover_url_l TEXT,
+    amazon_product_url TEXT,
+    amazon_search_url TEXT,
+    query TEXT,
+    fetched_at TEXT,
+    pending_enrichment TEXT
+);
+CREATE TABLE authors (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE publishers (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE subjects (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE book_authors (book_id INTEGER NOT NULL, author_id INTEGER NOT NULL, position INTEGER NOT NULL);
+CREATE TABLE book_publishers (book_id INTEGER NOT NULL, publisher_id INTEGER NOT NULL, position INTEGER NOT NULL);
+CREATE TABLE book_subjects (book_id INTEGER NOT NULL, subject_id INTEGER NOT NULL, position INTEGER NOT NULL);
+CREATE TABLE book_isbns (book_id INTEGER NOT NULL, isbn TEXT NOT NULL, position INTEGER NOT NULL);
+"""
+
+_SQLITE_INDEXES = """
+CREATE INDEX idx_book_authors_author ON book_authors(author_id);
+CREATE INDEX idx_book_publishers_publisher ON book_publishers(publisher_id);
+CREATE INDEX idx_book_subjects_subject ON book_subjects(subject_id);
+CREATE INDEX idx_book_isbns_isbn ON book_isbns(isbn);
+CREATE INDEX idx_books_work ON books(openlibrary_work_key);
+"""
+
+
+class SqliteWriter(ResultWriter):
+    """SQLite データベースに書き出す。
+
+    著者・出版社・主題は別表にし、同じ名前は1行だけ（IDで参照）にまとめます（辞書化）。
+    ISBN は book_isbns 表に1件ずつ入ります。
+    """
+
+    commit_every = 1000  # この件数ごとにまとめて確定する
+
+    def _open(self, tmp_path: Optional[str]) -> None:
+        import sqlite3
+
+        if not tmp_path:
+            raise ValueError("sqlite output requires --output-file")
+        os.remove(tmp_path)  # mkstemp の空ファイルではなく新しいDBとして作る
+        self._conn = sqlite3.connect(tmp_path)
+        self._conn.execute("PRAGMA journal_mode=OFF")  # 一時ファイルに書くため、途中の保護は不要
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.executescript(_SQLITE_SCHEMA)
+        self._ids: Dict[str, Dict[str, int]] = {"authors": {}, "publishers": {}, "subjects": {}}
+
+    def _lookup_id(self, table: str, name: str) -> int:
+        ids = self._ids[table]
+        rid = ids.get(name)
+        if rid is None:
+            rid = self._conn.execute(f"INSERT INTO {table} (name) VALUES (?)", (name,)).lastrowid
+            ids[name] = rid
+        return rid
+
+    def _write_record(self, info: BookInfo) -> None:
+        row = _flat_row(info)
+        cols = [k for k in row if not isinstance(row[k], list)]
+        values = [row[k] for k in cols]
+        cols.append("pending_enrichment")
+        values.append(",".join(row["pending_enrichment"]) or None)
+        book_id = self._conn.execute(
+            f"INSERT INTO books ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)})", values
+        ).lastrowid
+        for table, link, fk, names in (
+            ("authors", "book_authors", "author_id", row["authors"]),
+            ("publishers", "book_publishers", "publisher_id", row["publishers"]),
+            ("subjects", "book_subjects", "subject_id", row["subjects"]),
+        ):
+            self._conn.executemany(
+                f"INSERT INTO {link} (book_id, {fk}, position) VALUES (?, ?, ?)",
+                [(book_id, self._lookup_id(table, str(n)), i) for i, n in enumerate(names)],
+            )
+        self._conn.executemany(
+            "INSERT INTO book_isbns (book_id, isbn, position) VALUES (?, ?, ?)",
+            [(book_id, isbn, i) for i, isbn in enumerate(row["isbns"])],
+        )
+        if (self.count + 1) % self.commit_every == 0:
+            self._conn.commit()
+
+    def _finish(self) -> None:
+        self._conn.executescript(_SQLITE_INDEXES)
+        self._conn.commit()
+
+    def _close_target(self) -> None:
+        conn = getattr(self, "_conn", None)
+        if conn is not None:
+            conn.close()
+            self._conn = None
+
+
+class ParquetWriter(ResultWriter):
+    """Parquet（列形式）で書き出す（pyarrow が必要）。
+
+    一定件数ごとに行グループとして書き出すので、メモリにはその分しか載りません。
+    出版社・主題など繰り返しの多い文字列は辞書エンコードされます。
+    """
+
+    row_group_size = 10000
+
+    def _open(self, tmp_path: Optional[str]) -> None:
+        if not tmp_path:
+            raise ValueError("parquet output requires --output-file")
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("pyarrow is required for --format parquet (pip install pyarrow)") from None
+        self._pa = pa
+        s, i, ls = pa.string(), pa.int32(), pa.list_(pa.string())
+        self._schema = pa.schema(
+            [
+                ("title", s), ("authors", ls), ("first_publish_year", i), ("publishers", ls),
+                ("publish_date", s), ("isbns", ls), ("openlibrary_work_key", s),
+                ("openlibrary_edition_key", s), ("openlibrary_url", s), ("description", s),
+                ("subjects", ls), ("cover_url_s", s), ("cover_url_m", s), ("cover_url_l", s),
+                ("amazon_product_url", s), ("amazon_search_url", s), ("query", s),
+                ("fetched_at", s), ("pending_enrichment", ls),
+            ]
+        )
+        self._writer = pq.ParquetWriter(tmp_path, self._schema, compression="zstd", use_dictionary=True)
+        self._rows: List[Dict[str, Any]] = []
+
+    def _flush(self) -> None:
+        if self._rows:
+            self._writer.write_table(self._pa.Table.from_pylist(self._rows, schema=self._schema))
+            self._rows = []
+
+    def _write_record(self, info: BookInfo) -> None:
+        self._rows.append(_flat_row(info))
+        if len(self._rows) >= self.row_group_size:
+            self._flush()
+
+    def _finish(self) -> None:
+        self._flush()
+
+    def _close_target(self) -> None:
+        writer = getattr(self, "_writer", None)
+        if writer is not None:
+            writer.close()
+            self._writer = None
+
+
+def open_writer(fmt: str, path: Optional[str] = None) -> ResultWriter:
+    """出力形式（text / json / jsonl / sqlite / parquet）に合った書き出し役を作る。"""
+    if fmt == "json":
+        return JsonArrayWriter(path)
+    if fmt == "jsonl":
+        return JsonLinesWriter(path)
+    if fmt == "sqlite":
+        return SqliteWriter(path)
+    if fmt == "parquet":
+        return ParquetWriter(path)
+    return TextWriter(path)
@@ -0,0 +1,31 @@
+"""起動時間の回帰テスト: book_fetcher.cli の読み込みで重いモジュールを読まないこと。"""
+
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_BUDGET_MS = 100  # README「開発メモ」の目安と同じ値
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import book_fetcher.cli
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({"ms": elapsed, "loaded": [m for m in ("requests", "book_fetcher.service") if m in sys.modules]}))
+"""
+
+
+def _probe() -> dict:
+    out = subprocess.run([sys.executable, "-c", _PROBE], cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    return json.loads(out)
+
+
+def test_cli_import_does_not_load_requests_or_service() -> None:
+    assert _probe()["loaded"] == []
+
+
+def test_cli_import_within_budget() -> None:
+    best = min(_probe()["ms"] for _ in range(3))  # 一番速い回で比べる（他の処理の影響を減らす）
+    assert best < IMPORT_BUDGET_MS, f"import book_fetcher.cli took {best:.1f} ms (budget {IMPORT_BUDGET_MS} ms)"